@@ -0,0 +1,29 @@
+"""JSON report header and output shared by the bench scripts."""
+import json
+import platform
+from datetime import datetime
+
+
+def add_output_argument(parser):
+    """Add the --output option every bench script accepts"""
+    parser.add_argument('--output', help='Write JSON here instead of stdout')
+
+
+def report_header(**fields) -> dict:
+    """Report starting with when and where it ran, followed by fields"""
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        **fields,
+    }
+
+
+def write_report(report: dict, output=None):
+    """Write report as indented JSON to output, or print it when output is None"""
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
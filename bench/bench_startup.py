@@ -0,0 +1,94 @@
+"""Measure dashboard cold start and guard the import budget.
+
+Run from the repository root:
+
+    python bench/bench_startup.py [--repeat 5] [--import-budget-ms 1500] [--output startup.json]
+
+Each measurement runs in a fresh interpreter: importing streamlit_budget, and
+the first and second script runs of the app in --test mode against an empty
+cache. Exits non-zero if the import goes over budget or pulls in a module
+that should only load on demand, so it can run as a CI check.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_report import add_output_argument, report_header, write_report
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported only when first needed, never by importing the app
+LAZY_MODULES = ['plotly.express']
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit_budget
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'loaded': [name for name in %r if name in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+RUN_PROBE = """
+import json, sys, time
+sys.argv = ['streamlit_budget.py', '--test']
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file('streamlit_budget.py', default_timeout=120)
+start = time.perf_counter()
+app.run()
+first = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+second = time.perf_counter() - start
+print(json.dumps({'first_run': first, 'second_run': second, 'exceptions': len(app.exception)}))
+"""
+
+
+def probe(code):
+    """Run code in a fresh interpreter at the repository root and parse its last stdout line"""
+    with tempfile.TemporaryDirectory(prefix='goblin-startup-') as cache_dir:
+        env = dict(os.environ, GOBLIN_CACHE_DIR=cache_dir)
+        result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, env=env,
+                                capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=1500)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    imports = [probe(IMPORT_PROBE) for _ in range(args.repeat)]
+    runs = [probe(RUN_PROBE) for _ in range(args.repeat)]
+
+    import_ms = min(result['seconds'] for result in imports) * 1000
+    eager = sorted({name for result in imports for name in result['loaded']})
+    report = report_header(
+        repeat=args.repeat,
+        import_ms=round(import_ms, 3),
+        import_budget_ms=args.import_budget_ms,
+        first_run_ms=round(min(result['first_run'] for result in runs) * 1000, 3),
+        second_run_ms=round(min(result['second_run'] for result in runs) * 1000, 3),
+        app_exceptions=max(result['exceptions'] for result in runs),
+        eagerly_imported=eager,
+    )
+    write_report(report, args.output)
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"importing streamlit_budget took {import_ms:.0f} ms, over the {args.import_budget_ms:.0f} ms budget")
+    if eager:
+        failures.append(f"importing streamlit_budget loaded {', '.join(eager)}, which should load on demand")
+    if report['app_exceptions']:
+        failures.append("the app raised during its first runs")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Time the budget pipeline on synthetic vaults and emit the results as JSON.
+
+Run from the repository root:
+
+    python bench/bench_suite.py [--sizes 10000 100000 1000000] [--repeat 3] [--output results.json]
+
+Each size gets a generated vault in a temporary directory laid out like the
+repository (test/testout.csv, test/testbudget.json), and the dashboard runs
+against it in --test mode. Compare two runs' JSON to spot regressions.
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_report import add_output_argument, report_header, write_report
+from synth_vault import generate_vault, write_vault
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def best_of(func, repeat, setup=None):
+    """Best wall time of func over repeat runs, calling setup untimed before each"""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_size(rows, years, repeat, workdir):
+    # Imported here so GOBLIN_CACHE_DIR is already pointing into workdir
+    import numpy as np
+    import pandas as pd
+    import streamlit_budget
+    from budget_core import AggregateCube, SearchIndex, credit_mask, display_frame, income_and_spend, pounds, trend_summary
+    from data_store import canonicalize, concat_transactions
+    from vulkan_api import parse_transactions_csv
+
+    transactions, budget = generate_vault(years=years, rows_per_month=max(1, rows // (years * 12)))
+    write_vault(os.path.join(workdir, 'test'), transactions, budget)
+    with open(os.path.join(workdir, 'test', 'testout.csv'), 'rb') as f:
+        csv_bytes = f.read()
+
+    months = sorted(budget)
+    month, other_month = months[-1], months[-2]
+    selected_date = date.fromisoformat(f"{month}-01")
+    other_date = date.fromisoformat(f"{other_month}-01")
+
+    def reset_caches():
+        streamlit_budget.load_and_process_data.clear()
+        streamlit_budget.get_transaction_store.clear()
+        streamlit_budget.get_budget_store.clear()
+        shutil.rmtree(os.environ['GOBLIN_CACHE_DIR'], ignore_errors=True)
+
+    def load(selected):
+        return streamlit_budget.load_and_process_data(selected, use_api=False)
+
+    results = {}
+    results['vulkan_parse'] = best_of(lambda: canonicalize(parse_transactions_csv(io.BytesIO(csv_bytes))), repeat)
+    results['load_and_process_data_cold'] = best_of(lambda: load(selected_date), repeat, setup=reset_caches)
+
+    # Warm: stores and cube are loaded, only the month changes
+    load(selected_date)
+    results['load_and_process_data_month_switch'] = best_of(
+        lambda: load(other_date), repeat, setup=streamlit_budget.load_and_process_data.clear)
+
+    snapshot = streamlit_budget.get_transaction_store(False).snapshot()
+    df = snapshot.df
+    index = snapshot.views['index']
+
+    def credit_pot():
+        return pounds(df[(df['Month'] == month).to_numpy() & credit_mask(df)]['AmountPence'].sum())
+
+    results['credit_pot'] = best_of(credit_pot, repeat)
+
+    top_category = df[df['Month'] == month]['Category'].value_counts().idxmax()
+
+    def drilldown():
+        rows = index.rows(df, month, top_category)
+        return display_frame(rows, ['Date', 'Name', 'Amount', 'SubCategory', 'PaymentMethod', 'Notes'])
+
+    results['category_drilldown'] = best_of(drilldown, repeat)
+
+    search_index = snapshot.views['search']
+    results['search_all'] = best_of(lambda: search_index.search('merchant 00'), repeat)
+    results['search_month_category'] = best_of(
+        lambda: search_index.search('merchant 00', within=index.positions(month, top_category)), repeat)
+
+    # Free-text notes make nearly every value distinct, the worst case for building the index
+    unique_notes = df.assign(Notes='Ref ' + pd.Series(range(len(df)), index=df.index).astype(str) + ' order '
+                             + pd.Series(range(len(df)), index=df.index).mul(7919).mod(100003).astype(str))
+    results['search_index_build'] = best_of(lambda: SearchIndex().rebuild(df), repeat)
+    results['search_index_build_unique_notes'] = best_of(lambda: SearchIndex().rebuild(unique_notes), repeat)
+    unique_search = SearchIndex()
+    unique_search.rebuild(unique_notes)
+    text = (unique_notes['Name'].astype(str) + ' ' + unique_notes['Notes']).str.lower()
+    expected = np.flatnonzero((text.str.contains(r'(?<![0-9a-z])ref') & text.str.contains(r'(?<![0-9a-z])12')).to_numpy())
+    assert np.array_equal(unique_search.search('ref 12'), expected)
+
+    # Multi-month views read running totals, so the whole history should cost about what one year does
+    cube = snapshot.views['cube']
+
+    def trend(start):
+        return trend_summary(cube, budget, start, month), income_and_spend(cube, budget, start, month)
+
+    results['trend_12_months'] = best_of(lambda: trend(months[-12]), repeat)
+    results['trend_all_months'] = best_of(lambda: trend(months[0]), repeat)
+
+    # A sync at the month rollover: the first rows of a new month, in one category only
+    history = df[(df['Month'] != month).to_numpy()]
+    first_rows = df[(df['Month'] == month).to_numpy() & (df['Category'] == top_category).to_numpy()].head(10)
+    synced = AggregateCube()
+    results['cube_sync_new_month'] = best_of(lambda: synced.add(first_rows), repeat,
+                                             setup=lambda: synced.rebuild(history))
+    rebuilt = AggregateCube()
+    rebuilt.rebuild(concat_transactions([history, first_rows]))
+    pd.testing.assert_frame_equal(synced._cells, rebuilt._cells)
+    pd.testing.assert_frame_equal(synced._cumulative, rebuilt._cumulative)
+
+    reset_caches()
+    return [
+        {'benchmark': name, 'rows': len(transactions), 'seconds': round(seconds, 6), 'repeat': repeat}
+        for name, seconds in results.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='goblin-bench-')
+    os.environ['GOBLIN_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    # The dashboard reads test data relative to the working directory
+    os.chdir(workdir)
+
+    import pandas as pd
+    try:
+        results = []
+        for rows in args.sizes:
+            results.extend(run_size(rows, args.years, args.repeat, workdir))
+            print(f"finished {rows} rows", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = report_header(pandas=pd.__version__, results=results)
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""Drive concurrent dashboard sessions against the mock Vulkan API and report latency.
+
+Run from the repository root:
+
+    python bench/load_harness.py [--sessions 8] [--steps 6] [--rows-per-month 2000] [--latency 0.2] [--output load.json]
+
+A mock server (bench/mock_vulkan.py) is started in-process unless --url is
+given, and the dashboard runs in API mode against it. Each session opens the
+app on the vault's newest month and steps back one month per interaction.
+Rerun latency is measured per interaction; the report gives p50/p99 and how
+many requests reached the upstream API. A --body-delay longer than
+--read-timeout exercises a hung upstream: every fetch times out mid-body and
+the app should still render without exceptions.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.request import urlopen
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_report import add_output_argument, report_header, write_report
+from mock_vulkan import add_vault_arguments, serve_in_thread, vault_from_arguments
+
+APP_PATH = os.path.join(REPO_ROOT, 'streamlit_budget.py')
+
+
+def upstream_stats(base_url):
+    with urlopen(f"{base_url}/_stats") as response:
+        return json.load(response)
+
+
+def run_session(first_month, steps, start_barrier, timeout):
+    """One user: open the app, then press Previous steps times; returns per-interaction seconds"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.session_state['selected_date'] = first_month
+    start_barrier.wait()
+
+    timings = []
+    start = time.perf_counter()
+    app.run()
+    timings.append(('open', time.perf_counter() - start))
+    errors = len(app.exception)
+    for _ in range(steps):
+        start = time.perf_counter()
+        app.button(key='prev_month').click().run()
+        timings.append(('previous_month', time.perf_counter() - start))
+        errors += len(app.exception)
+    return timings, errors
+
+
+def percentiles(seconds):
+    if not seconds:
+        return {}
+    values = np.asarray(seconds) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--steps', type=int, default=6, help='Month changes per session')
+    parser.add_argument('--url', help='Use an already running API instead of starting the mock')
+    parser.add_argument('--timeout', type=float, default=120, help='Seconds allowed for one rerun')
+    parser.add_argument('--read-timeout', type=float, help="Client read timeout in seconds (default: the app's)")
+    add_output_argument(parser)
+    add_vault_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url = args.url
+        first_month = date.today().replace(day=1)
+    else:
+        vault = vault_from_arguments(args)
+        server, base_url = serve_in_thread(vault)
+        first_month = date.fromisoformat(vault.transactions['Date'].max()[:7] + '-01')
+
+    # The app reads its upstream and cache location from the environment at import time
+    workdir = tempfile.mkdtemp(prefix='goblin-load-')
+    os.environ['VULKAN_API_URL'] = base_url
+    os.environ['WELL_API_KEY'] = args.api_key
+    os.environ['GOBLIN_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    if args.read_timeout is not None:
+        os.environ['VULKAN_API_READ_TIMEOUT'] = str(args.read_timeout)
+    os.chdir(REPO_ROOT)
+    # Sessions must run in API mode, whatever this script was started with
+    sys.argv = [APP_PATH]
+
+    before = upstream_stats(base_url)
+    start_barrier = threading.Barrier(args.sessions)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [pool.submit(run_session, first_month, args.steps, start_barrier, args.timeout)
+                       for _ in range(args.sessions)]
+            sessions = [future.result() for future in futures]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    wall = time.perf_counter() - started
+    after = upstream_stats(base_url)
+    if server:
+        server.shutdown()
+
+    timings = [timing for session_timings, _ in sessions for timing in session_timings]
+    report = report_header(
+        sessions=args.sessions,
+        steps=args.steps,
+        wall_seconds=round(wall, 3),
+        app_exceptions=sum(errors for _, errors in sessions),
+        latency={
+            'all': percentiles([seconds for _, seconds in timings]),
+            'open': percentiles([seconds for kind, seconds in timings if kind == 'open']),
+            'previous_month': percentiles([seconds for kind, seconds in timings if kind == 'previous_month']),
+        },
+        upstream={
+            field: after[field] - before[field]
+            for field in ('requests', 'unauthorized', 'errors', 'not_modified', 'bytes')
+        },
+        upstream_paths={
+            path: count - before['paths'].get(path, 0) for path, count in after['paths'].items()
+        },
+        upstream_formats={
+            fmt: count - before['formats'].get(fmt, 0) for fmt, count in after['formats'].items()
+        },
+    )
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
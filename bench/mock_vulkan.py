@@ -0,0 +1,293 @@
+"""Serve a synthetic vault over the Vulkan API's /vault/data and /vault/budget routes.
+
+Run from the repository root:
+
+    python bench/mock_vulkan.py [--port 8765] [--api-key dev] [--rows-per-month 2000] [--latency 0.2] [--error-rate 0.05]
+
+then point the dashboard at it in API mode:
+
+    VULKAN_API_URL=http://127.0.0.1:8765 WELL_API_KEY=dev streamlit run streamlit_budget.py
+
+Requests without the right X-API-KEY get 401. Latency, transient 503s and
+slowly trickled bodies can be injected to exercise the client's timeouts,
+retries and streaming parse. /vault/data answers in the best format the
+client's Accept header allows out of --formats: an Arrow IPC stream or
+Parquet (both zstd-compressed), or CSV (gzipped when the client accepts it).
+GET /_stats returns request counts as JSON.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synth_vault import generate_vault
+
+# Bytes written per chunk when trickling a slow body
+BODY_CHUNK_BYTES = 64 * 1024
+
+# Transfer formats for /vault/data by name, as (media type, whether to gzip it)
+FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', False),
+    'parquet': ('application/vnd.apache.parquet', False),
+    'csv': ('text/csv', True),
+}
+
+# Text columns sent dictionary-encoded in the binary formats; they decode straight to categoricals
+DICTIONARY_COLUMNS = ['Name', 'Category', 'SubCategory', 'PaymentMethod']
+
+
+def encode_transactions(rows, fmt):
+    """rows as a /vault/data body in the named format"""
+    if fmt == 'csv':
+        return rows.to_csv(index=False, float_format='%.2f').encode()
+    columns = {'Date': pa.array(pd.to_datetime(rows['Date']).to_numpy().astype('datetime64[D]'))}
+    for column in rows.columns.drop('Date'):
+        values = rows[column]
+        if not pd.api.types.is_numeric_dtype(values):
+            # Empty text is missing, as it reads back from CSV
+            values = values.mask(values == '')
+        values = pa.array(values.to_numpy(), from_pandas=True)
+        columns[column] = values.dictionary_encode() if column in DICTIONARY_COLUMNS else values
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    if fmt == 'arrow':
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+            writer.write_table(table, max_chunksize=64 * 1024)
+    else:
+        pq.write_table(table, sink, compression='zstd')
+    return sink.getvalue().to_pybytes()
+
+
+def negotiate(accept, formats):
+    """Name of the format in formats the Accept header ranks highest, CSV if it names none"""
+    ranked = []
+    for position, part in enumerate((accept or '').split(',')):
+        media_type, _, params = part.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                quality = float(value or 0)
+        ranked.append((-quality, position, media_type.strip()))
+    for _, _, media_type in sorted(ranked):
+        for fmt in formats:
+            if FORMATS[fmt][0] == media_type:
+                return fmt
+    return 'csv'
+
+
+class MockVault:
+    """Encoded vault bodies, faults to inject and counts of what was served"""
+
+    def __init__(self, transactions, budget, api_key='dev', latency=0.0, jitter=0.0, error_rate=0.0,
+                 body_delay=0.0, formats=('arrow', 'parquet', 'csv'), seed=0):
+        self.api_key = api_key
+        self.formats = list(formats)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.body_delay = body_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'unauthorized': 0, 'errors': 0, 'not_modified': 0, 'bytes': 0,
+                      'paths': {}, 'formats': {}}
+        self.set_vault(transactions, budget)
+
+    def set_vault(self, transactions, budget):
+        """Replace the served vault; clients holding old validators see the change"""
+        dates = transactions['Date'].to_numpy()
+        budget_body = json.dumps(budget).encode()
+        with self._lock:
+            self.transactions = transactions
+            self.dates = dates
+            # Full-history bodies per format, encoded on first request
+            self._bodies = {}
+            self.budget_body = budget_body
+            self.last_modified = formatdate(time.time(), usegmt=True)
+
+    def count(self, field, key=None):
+        with self._lock:
+            if key is None:
+                self.stats[field] += 1
+            else:
+                self.stats[field][key] = self.stats[field].get(key, 0) + 1
+
+    def sent(self, size):
+        with self._lock:
+            self.stats['bytes'] += size
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.stats))
+
+    def delay(self):
+        """Seconds to stall before answering"""
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def transactions_body(self, since=None, fmt='csv'):
+        """Body in fmt for every transaction, or only those dated on or after since"""
+        if since:
+            return encode_transactions(self.transactions[self.dates >= since], fmt)
+        with self._lock:
+            body = self._bodies.get(fmt)
+        if body is None:
+            body = encode_transactions(self.transactions, fmt)
+            with self._lock:
+                self._bodies[fmt] = body
+        return body
+
+
+class MockVulkanHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        vault = self.server.vault
+        url = urlparse(self.path)
+
+        if url.path == '/_stats':
+            return self._send(200, json.dumps(vault.snapshot()).encode(), 'application/json')
+
+        vault.count('requests')
+        vault.count('paths', url.path)
+        if self.headers.get('X-API-KEY') != vault.api_key:
+            vault.count('unauthorized')
+            return self._send(401, b'{"error": "invalid API key"}', 'application/json')
+
+        time.sleep(vault.delay())
+        if vault.should_fail():
+            vault.count('errors')
+            return self._send(503, b'{"error": "injected failure"}', 'application/json')
+
+        gzip_body = True
+        headers = {}
+        if url.path == '/vault/data':
+            since = parse_qs(url.query).get('since', [None])[0]
+            fmt = negotiate(self.headers.get('Accept'), vault.formats)
+            vault.count('formats', fmt)
+            content_type, gzip_body = FORMATS[fmt]
+            body = vault.transactions_body(since, fmt)
+            headers['Vary'] = 'Accept, Accept-Encoding'
+        elif url.path == '/vault/budget':
+            body, content_type = vault.budget_body, 'application/json'
+        else:
+            return self._send(404, b'{"error": "not found"}', 'application/json')
+
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            vault.count('not_modified')
+            return self._send(304, b'', headers={'ETag': etag})
+
+        headers.update({'ETag': etag, 'Last-Modified': vault.last_modified})
+        if gzip_body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        self._send(200, body, content_type, headers, vault.body_delay)
+
+    def _send(self, status, body, content_type=None, headers=None, body_delay=0.0):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status == 304:
+            return
+        self.server.vault.sent(len(body))
+        try:
+            if not body_delay:
+                self.wfile.write(body)
+                return
+            # Trickle the body so the client sees a slow transfer rather than a slow first byte
+            for start in range(0, len(body), BODY_CHUNK_BYTES):
+                self.wfile.write(body[start:start + BODY_CHUNK_BYTES])
+                self.wfile.flush()
+                time.sleep(body_delay)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def make_server(vault, host='127.0.0.1', port=0, verbose=False):
+    """A threaded HTTP server for vault; port 0 picks a free port"""
+    server = ThreadingHTTPServer((host, port), MockVulkanHandler)
+    server.daemon_threads = True
+    server.vault = vault
+    server.verbose = verbose
+    return server
+
+
+def serve_in_thread(vault, host='127.0.0.1', port=0):
+    """Start a server for vault on a daemon thread and return (server, base_url)"""
+    server = make_server(vault, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def add_vault_arguments(parser):
+    """Vault size and fault injection options shared with the load harness"""
+    parser.add_argument('--api-key', default='dev')
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--rows-per-month', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--start', default='2024-01')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- seconds added to --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered 503')
+    parser.add_argument('--body-delay', type=float, default=0.0,
+                        help=f'Seconds to wait between {BODY_CHUNK_BYTES // 1024} KiB body chunks')
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS),
+                        help='Formats /vault/data can answer in; csv alone mimics a server without binary support')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def vault_from_arguments(args):
+    transactions, budget = generate_vault(years=args.years, rows_per_month=args.rows_per_month,
+                                          categories=args.categories, start=args.start, seed=args.seed)
+    return MockVault(transactions, budget, api_key=args.api_key, latency=args.latency, jitter=args.jitter,
+                     error_rate=args.error_rate, body_delay=args.body_delay, formats=args.formats, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    add_vault_arguments(parser)
+    args = parser.parse_args()
+
+    vault = vault_from_arguments(args)
+    server = make_server(vault, args.host, args.port, args.verbose)
+    print(f"Serving {len(vault.transactions)} transactions on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Generate synthetic vaults in the same CSV/JSON shapes as test/.
+
+Run from the repository root:
+
+    python bench/synth_vault.py OUTDIR [--years 3] [--rows-per-month 2000] [--categories 12]
+
+OUTDIR receives testout.csv and testbudget.json, so it can stand in for test/.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAYMENT_METHODS = ['Debit Card', 'Credit Card', 'Direct Debit', 'PayPal']
+
+NOTES = ['', '', '', '', 'Monthly', 'Weekend', 'Gift', 'Work expense']
+
+
+def generate_vault(years=2, rows_per_month=1000, categories=10, subcategories=5, merchants=500,
+                   payment_methods=None, start='2024-01', seed=0):
+    """Build (transactions, budget) for a synthetic vault.
+
+    transactions has the vault's CSV columns with rows in date order; budget
+    maps every YYYY-MM month to a per-category budget.
+    """
+    rng = np.random.default_rng(seed)
+    payment_methods = payment_methods or DEFAULT_PAYMENT_METHODS
+    months = pd.period_range(start=start, periods=years * 12, freq='M')
+    rows = len(months) * rows_per_month
+
+    # Spread rows evenly over months, then uniformly over each month's days
+    month_index = np.repeat(np.arange(len(months)), rows_per_month)
+    month_starts = months.to_timestamp().to_numpy()
+    days_in_month = months.days_in_month.to_numpy()
+    day_offset = (rng.random(rows) * days_in_month[month_index]).astype('int64')
+    dates = month_starts[month_index] + day_offset.astype('timedelta64[D]')
+    order = np.argsort(dates, kind='stable')
+
+    # Skewed category choice so a few categories dominate, as in a real vault
+    category_weights = 1 / np.arange(1, categories + 1)
+    category = rng.choice(categories, size=rows, p=category_weights / category_weights.sum())
+    subcategory = rng.integers(0, subcategories, rows)
+    merchant = rng.zipf(1.3, rows) % merchants
+
+    category_names = np.array([f"Category {i:02d}" for i in range(categories)], dtype=object)
+    subcategory_names = np.array([f"Sub {j:02d}" for j in range(subcategories)], dtype=object)
+    merchant_names = np.array([f"Merchant {k:04d}" for k in range(merchants)], dtype=object)
+
+    transactions = pd.DataFrame({
+        'Date': pd.to_datetime(dates[order]).strftime('%Y-%m-%d'),
+        'Name': merchant_names[merchant[order]],
+        'Amount': np.round(rng.lognormal(3, 1, rows)[order], 2),
+        'Category': category_names[category[order]],
+        'SubCategory': (category_names[category[order]] + ' ' + subcategory_names[subcategory[order]]),
+        'PaymentMethod': np.array(payment_methods, dtype=object)[rng.integers(0, len(payment_methods), rows)],
+        'Notes': np.array(NOTES, dtype=object)[rng.integers(0, len(NOTES), rows)],
+    })
+
+    # Budget each category near its expected monthly spend
+    expected = transactions.groupby('Category')['Amount'].sum() / len(months)
+    budget = {
+        str(month): {name: float(round(expected.get(name, 0.0) * rng.uniform(0.8, 1.2), -1)) for name in category_names}
+        for month in months
+    }
+    return transactions, budget
+
+
+def write_vault(directory, transactions, budget):
+    """Write transactions and budget as testout.csv and testbudget.json in directory"""
+    os.makedirs(directory, exist_ok=True)
+    transactions.to_csv(os.path.join(directory, 'testout.csv'), index=False, float_format='%.2f')
+    with open(os.path.join(directory, 'testbudget.json'), 'w') as f:
+        json.dump(budget, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('outdir')
+    parser.add_argument('--years', type=int, default=2)
+    parser.add_argument('--rows-per-month', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=10)
+    parser.add_argument('--subcategories', type=int, default=5)
+    parser.add_argument('--merchants', type=int, default=500)
+    parser.add_argument('--payment-methods', nargs='+', default=DEFAULT_PAYMENT_METHODS)
+    parser.add_argument('--start', default='2024-01')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    transactions, budget = generate_vault(
+        years=args.years, rows_per_month=args.rows_per_month, categories=args.categories,
+        subcategories=args.subcategories, merchants=args.merchants,
+        payment_methods=args.payment_methods, start=args.start, seed=args.seed,
+    )
+    write_vault(args.outdir, transactions, budget)
+    print(f"Wrote {len(transactions)} transactions over {len(budget)} months to {args.outdir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,515 @@
+import re
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import Dict, Optional, Tuple
+
+from data_store import canonicalize
+
+# Column order of the per-month summary
+SUMMARY_COLUMNS = ['Budget', 'Actual', 'Remaining', 'Percentage', 'Overspend', 'Notes']
+
+# Transaction columns as shown to users, in the vault's CSV order
+TRANSACTION_COLUMNS = ['Date', 'Name', 'Amount', 'Category', 'SubCategory', 'PaymentMethod', 'Notes']
+
+# Categories left out of the monthly summary
+EXCLUDED_CATEGORIES = ['Fun']
+
+# Categories whose transactions are money in rather than spending
+INCOME_CATEGORIES = ['Income']
+
+# Columns of the multi-month budget vs actual summary
+TREND_COLUMNS = ['Budget', 'Actual', 'Remaining', 'Percentage']
+
+def _plain_levels(index: pd.MultiIndex) -> pd.MultiIndex:
+    # Categorical group keys come back as CategoricalIndex levels; plain levels align and sort as text
+    return index.set_levels([level.astype(object) for level in index.levels])
+
+def pounds(pence) -> pd.Series:
+    """Convert integer pence to float pounds"""
+    return pence / 100
+
+def credit_mask(df: pd.DataFrame) -> np.ndarray:
+    """Rows paid by a credit method, decided once per PaymentMethod category rather than per row"""
+    methods = df['PaymentMethod']
+    is_credit = np.append(np.asarray(methods.cat.categories.str.contains('Credit', case=False), dtype=bool), False)
+    # Missing methods have code -1, which picks the trailing False
+    return is_credit[methods.cat.codes.to_numpy()]
+
+def display_frame(rows: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Rows as shown to users: Date as YYYY-MM-DD text and Amount in pounds"""
+    display = pd.DataFrame(index=rows.index)
+    for column in columns:
+        if column == 'Date':
+            display['Date'] = rows['Date'].dt.strftime('%Y-%m-%d')
+        elif column == 'Amount':
+            display['Amount'] = pounds(rows['AmountPence'])
+        else:
+            display[column] = rows[column]
+    return display
+
+def _sort_key(column: pd.Series) -> np.ndarray:
+    # Category codes follow the sorted categories, so sorting codes sorts by text without touching strings
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy()
+    if column.dtype == 'string':
+        return column.fillna('').to_numpy(dtype=object)
+    return column.to_numpy()
+
+def transaction_page(df: pd.DataFrame, page: int = 0, page_size: int = 50, sort_by: str = 'Date',
+                     ascending: bool = False, start=None, end=None, categories=None, payment_methods=None,
+                     positions: Optional[np.ndarray] = None) -> Tuple[pd.DataFrame, int]:
+    """One page of filtered, sorted transactions ready for display, and how many rows matched.
+
+    Filters and the sort run on whole columns of the canonical frame; only the
+    rows on the requested page are copied and formatted. positions, such as
+    a SearchIndex result, limits the candidates to those rows.
+    """
+    if df.empty:
+        return display_frame(df, TRANSACTION_COLUMNS), 0
+
+    if positions is None:
+        mask = np.ones(len(df), dtype=bool)
+    else:
+        mask = np.zeros(len(df), dtype=bool)
+        mask[positions] = True
+    dates = df['Date'].to_numpy()
+    if start is not None:
+        mask &= dates >= np.datetime64(pd.Timestamp(start))
+    if end is not None:
+        mask &= dates < np.datetime64(pd.Timestamp(end) + pd.Timedelta(days=1))
+    if categories:
+        mask &= df['Category'].isin(categories).to_numpy()
+    if payment_methods:
+        mask &= df['PaymentMethod'].isin(payment_methods).to_numpy()
+
+    positions = np.flatnonzero(mask)
+    key = _sort_key(df['AmountPence'] if sort_by == 'Amount' else df[sort_by])[positions]
+    order = np.argsort(key, kind='stable')
+    if not ascending:
+        order = order[::-1]
+
+    first = page * page_size
+    rows = df.iloc[positions[order[first:first + page_size]]]
+    return display_frame(rows, TRANSACTION_COLUMNS), len(positions)
+
+def build_final_view(df: pd.DataFrame, budget_dict: Dict[str, float]) -> pd.DataFrame:
+    """Summarise transactions into SubCategory rows plus a budgeted Total row per Category"""
+    df = canonicalize(df)
+    # Actual spend per (Category, SubCategory), sorted like pivot_table
+    actual = df.groupby(['Category', 'SubCategory'], sort=True, observed=True)['AmountPence'].sum()
+    actual.index = _plain_levels(actual.index)
+    return summarize_actuals(pounds(actual), budget_dict)
+
+def empty_summary() -> pd.DataFrame:
+    """Summary with no rows, for months without transactions"""
+    return pd.DataFrame(columns=SUMMARY_COLUMNS, index=pd.MultiIndex.from_tuples([], names=['Category', 'SubCategory']))
+
+def summarize_month(df: pd.DataFrame, budget_dict: Dict[str, float]) -> pd.DataFrame:
+    """Summary of one month's transactions without the excluded categories, empty if none remain"""
+    df = canonicalize(df)
+    if not df.empty:
+        df = df[~df['Category'].isin(EXCLUDED_CATEGORIES)]
+    if df.empty:
+        return empty_summary()
+    return build_final_view(df, budget_dict)
+
+def with_budget_placeholders(df: pd.DataFrame, budget_dict: Dict[str, float]) -> pd.DataFrame:
+    """An empty summary gets a zero-spend Total row per budgeted category; anything else is returned as is"""
+    if not df.empty or not budget_dict:
+        return df
+    # Create placeholder rows for each budget category
+    placeholder_data = []
+    for category in budget_dict:
+        placeholder_data.append({
+            'Budget': budget_dict[category],
+            'Actual': 0.0,
+            'Remaining': budget_dict[category],
+            'Percentage': 0.0,
+            'Overspend': 0.0,
+            'Notes': ""
+        })
+    
+    df = pd.DataFrame(placeholder_data)
+    df.index = pd.MultiIndex.from_tuples(
+        [(cat, 'Total') for cat in budget_dict.keys()], 
+        names=['Category', 'SubCategory']
+    )
+    return df
+
+def summarize_actuals(actual: pd.Series, budget_dict: Dict[str, float]) -> pd.DataFrame:
+    """Build the summary from spend already summed per sorted (Category, SubCategory).
+
+    Every step is a whole-column operation, so the cost grows with the number
+    of subcategories rather than categories x rows.
+    """
+    categories = actual.index.get_level_values(0)
+    subcategories = actual.index.get_level_values(1)
+
+    # One Total row per category, budgeted from budget_dict
+    category_totals = actual.groupby(level=0, sort=False).sum()
+    total_budget = category_totals.index.map(lambda category: budget_dict.get(category, 0.0)).to_numpy(dtype='float64')
+    total_actual = category_totals.to_numpy(dtype='float64')
+
+    # Place each Total row right after its category's subcategories
+    n_detail, n_total = len(actual), len(category_totals)
+    category_position = np.concatenate([
+        category_totals.index.get_indexer(categories),
+        np.arange(n_total),
+    ])
+    is_total = np.concatenate([np.zeros(n_detail, dtype=bool), np.ones(n_total, dtype=bool)])
+    order = np.lexsort((is_total, category_position))
+
+    index = pd.MultiIndex.from_arrays([
+        np.concatenate([categories.to_numpy(dtype=object), category_totals.index.to_numpy(dtype=object)])[order],
+        np.concatenate([subcategories.to_numpy(dtype=object), np.full(n_total, 'Total', dtype=object)])[order],
+    ])
+    is_total = is_total[order]
+
+    actual_values = np.concatenate([actual.to_numpy(dtype='float64'), total_actual])[order]
+    budget_values = np.concatenate([np.zeros(n_detail), total_budget])[order]
+
+    # Remaining/Overspend/Percentage only apply to Total rows; detail rows stay at zero
+    remaining = np.where(is_total, budget_values - actual_values, 0.0)
+    overspend = np.where(is_total, actual_values - budget_values, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(is_total & (budget_values > 0), actual_values / budget_values * 100, 0.0)
+
+    final_view = pd.DataFrame({
+        'Budget': budget_values,
+        'Actual': actual_values,
+        'Remaining': remaining,
+        'Percentage': percentage,
+        'Overspend': overspend,
+    }, index=index)
+    final_view['Percentage'] = final_view['Percentage'].round(1)
+    final_view['Notes'] = ""
+
+    return final_view[SUMMARY_COLUMNS]
+
+
+class AggregateCube:
+    """Spend sum and transaction count per (Month, Category, SubCategory).
+
+    Built in one pass over every transaction and then updated with each synced
+    batch, so showing any month is a slice of the cube rather than a reload.
+    Alongside the cells it keeps a Month x Category table of spend and its
+    running total down the months, so any range of months is summed from two
+    rows whatever its length. Attach it to a TransactionStore to keep it
+    current.
+    """
+
+    INDEX_NAMES = ['Month', 'Category', 'SubCategory']
+
+    def __init__(self):
+        self._cells = pd.DataFrame(
+            {'AmountPence': pd.Series(dtype='int64'), 'Count': pd.Series(dtype='int64')},
+            index=pd.MultiIndex.from_arrays([[], [], []], names=self.INDEX_NAMES),
+        )
+        self._by_month = pd.DataFrame(dtype='int64', index=pd.Index([], dtype=object, name='Month'))
+        self._cumulative = self._by_month
+
+    @staticmethod
+    def _month_totals(cells: pd.DataFrame) -> pd.DataFrame:
+        # Month x Category spend in pence from (Month, Category, SubCategory) cells
+        return cells['AmountPence'].groupby(level=[0, 1]).sum().unstack(fill_value=0)
+
+    def _set_monthly(self, by_month: pd.DataFrame):
+        by_month = by_month.sort_index().sort_index(axis=1).astype('int64')
+        # Publish both together so a reader never pairs a table with another's running total
+        self._by_month, self._cumulative = by_month, by_month.cumsum()
+
+    @classmethod
+    def _aggregate(cls, rows: pd.DataFrame) -> pd.DataFrame:
+        cells = rows.groupby(cls.INDEX_NAMES, sort=True, observed=True).agg(
+            AmountPence=('AmountPence', 'sum'),
+            Count=('AmountPence', 'size'),
+        )
+        cells.index = _plain_levels(cells.index)
+        return cells
+
+    def rebuild(self, df: pd.DataFrame):
+        """Recompute the whole cube from every transaction"""
+        self._cells = self._aggregate(df) if not df.empty else self._cells.iloc[:0]
+        self._set_monthly(self._month_totals(self._cells) if not self._cells.empty else self._by_month.iloc[:0, :0])
+
+    def add(self, rows: pd.DataFrame):
+        """Fold a batch of new transactions into the cube"""
+        if rows.empty:
+            return
+        batch = self._aggregate(rows)
+        if self._cells.empty:
+            self._cells = batch
+            self._set_monthly(self._month_totals(batch))
+            return
+        cells = self._cells.add(batch, fill_value=0).sort_index()
+        self._cells = cells.astype('int64')
+        # Only the batch's months change; the running total is redone over months x categories, not rows
+        batch_months = self._month_totals(batch)
+        months = self._by_month.index.union(batch_months.index)
+        categories = self._by_month.columns.union(batch_months.columns)
+        # A new month or category is missing from one side; align both first so every cell is a number
+        self._set_monthly(self._by_month.reindex(index=months, columns=categories, fill_value=0)
+                          + batch_months.reindex(index=months, columns=categories, fill_value=0))
+
+    def months(self) -> list:
+        """Months with at least one transaction, oldest first"""
+        return list(self._cells.index.get_level_values(0).unique())
+
+    def month(self, month: str) -> pd.DataFrame:
+        """Amount (pounds), AmountPence and Count per (Category, SubCategory) for one YYYY-MM month"""
+        cells = self._cells
+        if month in cells.index.get_level_values(0):
+            cells = cells.xs(month, level=0)
+        else:
+            cells = cells.iloc[:0].droplevel(0)
+        return cells.assign(Amount=pounds(cells['AmountPence']))
+
+    def range_totals(self, start: str, end: str) -> pd.Series:
+        """Spend in pence per Category over the YYYY-MM months start to end inclusive"""
+        cumulative = self._cumulative
+        months = cumulative.index
+        last = months.searchsorted(end, side='right') - 1
+        before = months.searchsorted(start, side='left') - 1
+        if last < 0 or last <= before:
+            return pd.Series(0, index=cumulative.columns, dtype='int64')
+        totals = cumulative.iloc[last]
+        if before >= 0:
+            totals = totals - cumulative.iloc[before]
+        return totals
+
+    def monthly_totals(self, start: str, end: str) -> pd.DataFrame:
+        """Spend in pence per Category (columns) for every month start to end inclusive (rows)"""
+        months = [str(month) for month in pd.period_range(start=start, end=end, freq='M')]
+        return self._by_month.reindex(index=months, fill_value=0).rename_axis('Month')
+
+
+def _spend_categories(categories) -> list:
+    return [category for category in categories
+            if category not in EXCLUDED_CATEGORIES and category not in INCOME_CATEGORIES]
+
+def trend_summary(cube: AggregateCube, budgets: Dict[str, Dict[str, float]], start: str, end: str) -> pd.DataFrame:
+    """Budget vs actual per spending category over the months start to end inclusive.
+
+    budgets is the budget document (or any part of it covering the range);
+    spend comes from the cube's running totals, so the cost does not grow
+    with the number of months.
+    """
+    actual = pounds(cube.range_totals(start, end))
+    budget = {}
+    for month, month_budget in budgets.items():
+        if start <= month <= end:
+            for category, amount in month_budget.items():
+                budget[category] = budget.get(category, 0.0) + amount
+    budget = pd.Series(budget, dtype='float64')
+    categories = sorted(_spend_categories(set(actual.index) | set(budget.index)))
+    summary = pd.DataFrame({
+        'Budget': budget.reindex(categories, fill_value=0.0).astype('float64'),
+        'Actual': actual.reindex(categories, fill_value=0).astype('float64'),
+    })
+    summary.index.name = 'Category'
+    summary['Remaining'] = summary['Budget'] - summary['Actual']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percentage = np.where(summary['Budget'] > 0, summary['Actual'] / summary['Budget'] * 100, 0.0)
+    summary['Percentage'] = np.round(percentage, 1)
+    return summary[TREND_COLUMNS].sort_values('Budget', ascending=False)
+
+def income_and_spend(cube: AggregateCube, budgets: Dict[str, Dict[str, float]], start: str, end: str) -> pd.DataFrame:
+    """Income, Spend, Net and Budget in pounds for every month start to end inclusive"""
+    by_month = cube.monthly_totals(start, end)
+    income_columns = [category for category in by_month.columns if category in INCOME_CATEGORIES]
+    spend_columns = _spend_categories(by_month.columns)
+    trend = pd.DataFrame({
+        'Income': pounds(by_month[income_columns].sum(axis=1)),
+        'Spend': pounds(by_month[spend_columns].sum(axis=1)),
+    }, index=by_month.index)
+    trend['Net'] = trend['Income'] - trend['Spend']
+    month_budgets = [budgets.get(month, {}) for month in trend.index]
+    trend['Budget'] = [float(sum(month_budget[category] for category in _spend_categories(month_budget)))
+                       for month_budget in month_budgets]
+    return trend
+
+
+class TransactionIndex:
+    """Row positions of the store frame grouped by (Month, Category).
+
+    Drill-down lookups cost O(result) instead of a scan of every transaction.
+    Attach it to a TransactionStore; positions refer to the frame of the
+    snapshot the index was read from.
+    """
+
+    def __init__(self):
+        self._positions = {}
+        self._size = 0
+
+    @staticmethod
+    def _group(rows: pd.DataFrame, offset: int) -> Dict:
+        keys = [rows['Month'].to_numpy(), rows['Category'].to_numpy()]
+        grouped = pd.Series(np.arange(offset, offset + len(rows))).groupby(keys, sort=False)
+        return {key: positions.to_numpy() for key, positions in grouped}
+
+    def rebuild(self, df: pd.DataFrame):
+        """Index every transaction from scratch"""
+        self._positions = self._group(df, 0) if not df.empty else {}
+        self._size = len(df)
+
+    def add(self, rows: pd.DataFrame):
+        """Index a batch of transactions just appended to the frame"""
+        if rows.empty:
+            return
+        positions = dict(self._positions)
+        for key, new_positions in self._group(rows, self._size).items():
+            existing = positions.get(key)
+            positions[key] = new_positions if existing is None else np.concatenate([existing, new_positions])
+        self._positions = positions
+        self._size += len(rows)
+
+    def positions(self, month: str, category: str) -> np.ndarray:
+        """Frame positions of one category's transactions in one YYYY-MM month, ascending"""
+        return self._positions.get((month, category), np.empty(0, dtype=np.int64))
+
+    def rows(self, df: pd.DataFrame, month: str, category: str) -> pd.DataFrame:
+        """Transactions of one category in one YYYY-MM month, in frame order"""
+        return df.iloc[self.positions(month, category)]
+
+
+def _union_sorted(runs: np.ndarray, count: int) -> np.ndarray:
+    # Sorted distinct positions of count concatenated sorted runs
+    if count == 1:
+        return runs
+    merged = np.sort(runs)
+    return merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+
+def _intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # Look the shorter array up in the longer one, O(short log long)
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    found = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[found] == a]
+
+
+class SearchIndex:
+    """Word index over Name and Notes answering prefix searches.
+
+    Distinct Name and Notes values are tokenized in one vectorized pass, and
+    the postings live in flat arrays: a sorted vocabulary, and for token i the
+    sorted frame positions positions[offsets[i]:offsets[i + 1]]. A prefix
+    matches a contiguous run of the vocabulary, so a query costs a couple of
+    bisects and one slice rather than a substring scan of every row.
+
+    Batches added after a rebuild are indexed as segments of their own and
+    merged with neighbours of similar size, so a sync only tokenizes its new
+    rows and never rewrites the whole index.
+    Attach it to a TransactionStore to index new rows as they sync.
+    """
+
+    COLUMNS = ['Name', 'Notes']
+    TOKEN_PATTERN = r'[0-9a-z]+'
+    SEPARATOR_PATTERN = r'[^0-9a-z]+'
+
+    def __init__(self):
+        self._segments = []
+        self._size = 0
+
+    @classmethod
+    def tokenize(cls, text: str) -> list:
+        """Lowercase words and numbers in text"""
+        return re.findall(cls.TOKEN_PATTERN, text.lower())
+
+    @classmethod
+    def _words(cls, values) -> pd.Series:
+        # Tokens of each value, indexed by the value's position in values
+        words = (pd.Series(np.asarray(values, dtype=object), dtype=pd.ArrowDtype(pa.string())).str.lower()
+                 .str.split(cls.SEPARATOR_PATTERN, regex=True).explode())
+        return words[(words != '').fillna(False).to_numpy()]
+
+    @classmethod
+    def _segment(cls, rows: pd.DataFrame, offset: int) -> Tuple[list, np.ndarray, np.ndarray]:
+        # (vocabulary, offsets, positions) for rows whose first row sits at frame position offset
+        words, owners = [], []
+        for column in cls.COLUMNS:
+            codes, values = pd.factorize(rows[column])
+            # Rows grouped by value: value i owns order[bounds[i]:bounds[i + 1]]
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            column_words = cls._words(values)
+            words.append(column_words)
+            owners.append((column_words.index.to_numpy(), order, bounds))
+        token_ids, vocabulary = pd.factorize(pd.concat(words, ignore_index=True))
+        # Repeat each value's tokens once per row holding that value
+        ids, positions, start = [], [], 0
+        for value_codes, order, bounds in owners:
+            counts = (bounds[1:] - bounds[:-1])[value_codes]
+            ends = np.cumsum(counts)
+            within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+            ids.append(np.repeat(token_ids[start:start + len(value_codes)], counts))
+            positions.append(order[np.repeat(bounds[value_codes], counts) + within] + offset)
+            start += len(value_codes)
+        return cls._postings(np.concatenate(ids), np.asarray(vocabulary, dtype=object), np.concatenate(positions))
+
+    @staticmethod
+    def _postings(token_ids: np.ndarray, vocabulary: np.ndarray, positions: np.ndarray) -> Tuple[list, np.ndarray, np.ndarray]:
+        # Sort the vocabulary, then sort (token, position) pairs and drop repeats, which arise
+        # when a word appears twice in one row or in both its Name and Notes
+        order = np.argsort(vocabulary)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        span = int(positions.max()) + 1 if len(positions) else 1
+        keys = np.sort(rank[token_ids] * span + positions)
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        token_ids, positions = np.divmod(keys, span)
+        offsets = np.searchsorted(token_ids, np.arange(len(order) + 1))
+        return list(vocabulary[order]), offsets, positions
+
+    @classmethod
+    def _merge(cls, segments: list) -> Tuple[list, np.ndarray, np.ndarray]:
+        # Renumber every segment's tokens against the union of their vocabularies
+        local_ids, vocabulary = pd.factorize(np.concatenate([np.asarray(words, dtype=object) for words, _, _ in segments]))
+        token_ids = np.repeat(local_ids, np.concatenate([np.diff(offsets) for _, offsets, _ in segments]))
+        return cls._postings(token_ids, np.asarray(vocabulary, dtype=object),
+                             np.concatenate([positions for _, _, positions in segments]))
+
+    def rebuild(self, df: pd.DataFrame):
+        """Index every transaction from scratch"""
+        self._segments = [self._segment(df, 0)] if not df.empty else []
+        self._size = len(df)
+
+    def add(self, rows: pd.DataFrame):
+        """Index a batch of transactions just appended to the frame"""
+        if rows.empty:
+            return
+        segments = self._segments + [self._segment(rows, self._size)]
+        # Merge the newest segment into its neighbour while they are of similar size, like carries
+        # in a binary counter: segments stay few and each posting is rewritten O(log n) times
+        while len(segments) > 1 and len(segments[-2][2]) <= 2 * len(segments[-1][2]):
+            segments = segments[:-2] + [self._merge(segments[-2:])]
+        self._segments = segments
+        self._size += len(rows)
+
+    def search(self, query: str, within: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Sorted positions of rows where every query word starts a word of Name or Notes.
+
+        within, sorted positions such as TransactionIndex.positions for a
+        (month, category), restricts the result to those rows. A query with
+        no words returns within unchanged, so None means no filter.
+        """
+        terms = self.tokenize(query)
+        if not terms:
+            return within
+        result = within
+        for term in terms:
+            parts = []
+            for vocabulary, offsets, positions in self._segments:
+                # Tokens are [0-9a-z]+ and '{' sorts after 'z', so term + '{' bounds every token starting with term
+                start, end = bisect_left(vocabulary, term), bisect_left(vocabulary, term + '{')
+                if end > start:
+                    parts.append(_union_sorted(positions[offsets[start]:offsets[end]], end - start))
+            if not parts:
+                return np.empty(0, dtype=np.int64)
+            # Later segments hold later rows, so their matches concatenate in order
+            matches = np.concatenate(parts) if len(parts) > 1 else parts[0]
+            result = matches if result is None else _intersect_sorted(result, matches)
+        return result
@@ -0,0 +1,472 @@
+import copy
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional
+
+import pandas as pd
+
+import profiling
+
+# Seconds a loaded transaction frame stays valid before the next read resyncs it
+DEFAULT_TTL_SECONDS = float(os.getenv('GOBLIN_CACHE_TTL', '300'))
+
+# Serve an expired entry while one background thread refreshes it, instead of blocking the reader
+STALE_WHILE_REVALIDATE = os.getenv('GOBLIN_STALE_WHILE_REVALIDATE', '1') != '0'
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the local on-disk copies of synced data
+CACHE_DIR = os.getenv('GOBLIN_CACHE_DIR', '.goblin_cache')
+
+# Text columns with few distinct values repeated across many rows, held as categoricals
+CATEGORICAL_COLUMNS = ['Month', 'Name', 'Category', 'SubCategory', 'PaymentMethod']
+
+
+def month_key(dates: pd.Series) -> pd.Series:
+    """YYYY-MM key for each date"""
+    # Period formatting is an order of magnitude faster than strftime per row
+    return pd.to_datetime(dates).dt.to_period('M').astype(str)
+
+
+def canonicalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the canonical in-memory schema to a raw transactions frame.
+
+    Date becomes datetime64 with a derived YYYY-MM Month key, Amount becomes
+    int64 AmountPence and repetitive text columns become categoricals. Frames
+    already in canonical form are returned unchanged.
+    """
+    if 'AmountPence' in df.columns or 'Date' not in df.columns:
+        return df
+
+    dates = pd.to_datetime(df['Date'])
+    canonical = pd.DataFrame({'Date': dates, 'Month': month_key(dates)}, index=df.index)
+    canonical['Name'] = df['Name']
+    canonical['AmountPence'] = (df['Amount'].fillna(0) * 100).round().astype('int64')
+    for column in df.columns:
+        if column not in ('Date', 'Name', 'Amount'):
+            canonical[column] = df[column]
+    for column in CATEGORICAL_COLUMNS:
+        if column in canonical.columns:
+            values = canonical[column].astype('category')
+            # Arrow and Parquet dictionaries arrive in first-seen order; sorted categories let codes sort as text
+            canonical[column] = values.cat.reorder_categories(values.cat.categories.sort_values())
+    return canonical.reset_index(drop=True)
+
+
+def empty_transactions() -> pd.DataFrame:
+    """Canonical transactions frame with no rows, for when nothing could be loaded"""
+    raw = pd.DataFrame({
+        'Date': pd.Series(dtype='str'), 'Name': pd.Series(dtype='str'), 'Amount': pd.Series(dtype='float64'),
+        'Category': pd.Series(dtype='str'), 'SubCategory': pd.Series(dtype='str'),
+        'PaymentMethod': pd.Series(dtype='str'), 'Notes': pd.Series(dtype='str'),
+    })
+    return canonicalize(raw)
+
+
+def concat_transactions(frames: list) -> pd.DataFrame:
+    """Concatenate canonical frames, unifying categories so the columns stay categorical"""
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    for column in CATEGORICAL_COLUMNS:
+        # Sorted categories keep groupby output in the same order as plain strings
+        categories = pd.Index(
+            pd.concat([pd.Series(frame[column].cat.categories) for frame in frames]).unique()
+        ).sort_values()
+        frames = [frame.assign(**{column: frame[column].cat.set_categories(categories)}) for frame in frames]
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    return pd.concat(frames, ignore_index=True)
+
+
+def diff_new_rows(existing: pd.DataFrame, fetched: pd.DataFrame, watermark: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """Rows of fetched that existing does not already hold.
+
+    With a watermark only rows dated on or after it are compared, for a fetch
+    that asked for rows since then; without one the whole fetch is diffed.
+    """
+    if existing.empty or fetched.empty:
+        return fetched
+
+    fetched = fetched.reindex(columns=existing.columns)
+    overlap = existing
+    if watermark is not None:
+        fetched = fetched[fetched['Date'] >= watermark]
+        overlap = existing[existing['Date'] >= watermark]
+
+    # Key rows by content plus occurrence number so genuine repeats
+    # (two identical coffees on one day) are not collapsed into one
+    def row_keys(df):
+        hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+        occurrence = hashes.groupby(hashes).cumcount()
+        return pd.MultiIndex.from_arrays([hashes.values, occurrence.values])
+
+    is_new = ~row_keys(fetched).isin(row_keys(overlap))
+    return fetched[is_new]
+
+
+class TransactionLog:
+    """Transaction log stored as one Parquet file per YYYY-MM.
+
+    The store reads it whole on startup and appending a batch rewrites only
+    the months it touches; the partitions survive server restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def partition_path(self, month: str) -> str:
+        return os.path.join(self.path, f"{month}.parquet")
+
+    def months(self) -> list:
+        """Months that have a partition, oldest first"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name[:-len('.parquet')] for name in os.listdir(self.path) if name.endswith('.parquet'))
+
+    def read_month(self, month: str) -> Optional[pd.DataFrame]:
+        """Load one month's transactions, or None if that month has no partition"""
+        path = self.partition_path(month)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path, memory_map=True)
+
+    def read(self) -> pd.DataFrame:
+        """Load every logged transaction, or an empty frame if nothing is logged yet"""
+        frames = [self.read_month(month) for month in self.months()]
+        if not frames:
+            return pd.DataFrame()
+        return concat_transactions(frames)
+
+    def append(self, rows: pd.DataFrame):
+        """Append rows to the partitions of the months they fall in; either every month is written or none"""
+        partitions = {}
+        for month, month_rows in rows.groupby('Month', sort=False, observed=True):
+            existing = self.read_month(month)
+            partitions[month] = month_rows if existing is None else concat_transactions([existing, month_rows])
+        self._write(partitions)
+
+    def replace(self, rows: pd.DataFrame):
+        """Make rows the whole log, dropping the partitions of months rows no longer has"""
+        partitions = dict(tuple(rows.groupby('Month', sort=False, observed=True))) if not rows.empty else {}
+        stale = [month for month in self.months() if month not in partitions]
+        self._write(partitions)
+        for month in stale:
+            os.remove(self.partition_path(month))
+
+    def _write(self, partitions: Dict[str, pd.DataFrame]):
+        # Stage every partition beside its file before swapping any in, so a failed write leaves the log as it was
+        os.makedirs(self.path, exist_ok=True)
+        staged = []
+        try:
+            for month, month_rows in partitions.items():
+                tmp_path = self.partition_path(month) + '.tmp'
+                staged.append(tmp_path)
+                month_rows.to_parquet(tmp_path, index=False)
+        except Exception:
+            for tmp_path in staged:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            raise
+        for month in partitions:
+            os.replace(self.partition_path(month) + '.tmp', self.partition_path(month))
+
+
+class LoadError(Exception):
+    """Raised by a store loader when upstream could not be read, as opposed to holding nothing"""
+
+
+class SharedCache(ABC):
+    """Process-wide cached value with single-flight loads and stale-while-revalidate.
+
+    Concurrent readers of a missing value queue on one load and share its
+    result. Once a value exists, an expired read returns it immediately and
+    starts a single background refresh. If the first load fails nothing is
+    cached, so each read serves an empty value and the next one retries.
+    Subclasses provide _value(), _empty() and _sync(), which runs under the
+    lock and must publish its result only once complete.
+    """
+
+    name = 'cache'
+
+    def __init__(self, ttl: float, stale_while_revalidate: bool):
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.version = 0
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+
+    @abstractmethod
+    def _value(self):
+        """The cached value, or None before the first load"""
+
+    @abstractmethod
+    def _empty(self):
+        """Value served while nothing has loaded"""
+
+    @abstractmethod
+    def _sync(self):
+        """Load the value and publish it; leave it unset if the first load fails"""
+
+    def is_fresh(self) -> bool:
+        """Whether the cached value exists and is within its TTL"""
+        return self._value() is not None and (time.monotonic() - self._loaded_at) < self.ttl
+
+    def _get(self):
+        value = self._value()
+        if value is not None and (self.is_fresh() or self.stale_while_revalidate):
+            profiling.cache_lookup(self.name, hit=True)
+            if not self.is_fresh():
+                self._refresh_in_background()
+            return value
+        profiling.cache_lookup(self.name, hit=False)
+        self.refresh(force=False)
+        value = self._value()
+        return value if value is not None else self._empty()
+
+    def refresh(self, force: bool = True):
+        """Reload now, waiting for it; without force, only if the value is missing or expired"""
+        # Callers that queued behind another load find the value fresh and return straight away
+        with self._lock:
+            if force or not self.is_fresh():
+                with profiling.span('sync', store=self.name):
+                    self._sync()
+
+    def _refresh_in_background(self):
+        with self._refreshing_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(force=False)
+            except Exception:
+                logger.exception("Background refresh of %s failed", self.name)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name=f"goblin-refresh-{self.name}", daemon=True).start()
+
+
+class TransactionSnapshot(NamedTuple):
+    """A transaction frame and the views derived from it, published together.
+
+    View positions index rows of this frame, so a reader takes the frame and
+    every view it needs from one snapshot rather than from separate reads.
+    """
+
+    df: pd.DataFrame
+    views: Dict[str, object]
+
+
+class TransactionStore(SharedCache):
+    """Shared in-memory transaction frame with a TTL and explicit invalidation.
+
+    Every consumer reads the same frame, so a rerun costs at most one upstream
+    fetch. Expired reads sync incrementally: the loader is asked only for rows
+    on or after the newest date held, and anything new is appended to the
+    frame and to the optional on-disk partitioned log. A loader that returns
+    the whole history instead (the test data, or a server ignoring since) is
+    diffed in full, and if rows held locally are missing from it, because
+    they were edited or deleted upstream, the frame and log are replaced by
+    the fetch. resync() asks for the whole history. The loader returns None
+    when nothing changed and raises LoadError when upstream could not be
+    read. Rows are held in the
+    canonical schema (see canonicalize). Each sync publishes a new immutable
+    TransactionSnapshot; callers must treat the returned frame as read-only.
+    """
+
+    name = 'transactions'
+
+    def __init__(self, loader: Callable[[Optional[str]], Optional[pd.DataFrame]], ttl: float = DEFAULT_TTL_SECONDS,
+                 log: Optional[TransactionLog] = None, stale_while_revalidate: bool = STALE_WHILE_REVALIDATE):
+        super().__init__(ttl, stale_while_revalidate)
+        self.loader = loader
+        self.log = log
+        self._snapshot: Optional[TransactionSnapshot] = None
+        # Views to build on the first load, before any snapshot exists
+        self._views: Dict[str, object] = {}
+
+    def _value(self):
+        return self._snapshot
+
+    def _empty(self):
+        views = {name: copy.copy(view) for name, view in self._views.items()}
+        df = empty_transactions()
+        for view in views.values():
+            view.rebuild(df)
+        return TransactionSnapshot(df, views)
+
+    def attach(self, name: str, view):
+        """Publish a derived view under name in every snapshot from now on.
+
+        The store calls view.rebuild(df) on a full load and view.add(rows) for
+        each synced batch, each time on a shallow copy of the previous
+        snapshot's view, so both methods must assign new attributes rather
+        than mutate the ones they hold.
+        """
+        with self._lock:
+            self._views = {**self._views, name: view}
+            snapshot = self._snapshot
+            if snapshot is not None:
+                view.rebuild(snapshot.df)
+                self._snapshot = snapshot._replace(views={**snapshot.views, name: view})
+
+    def watermark(self) -> Optional[pd.Timestamp]:
+        """Newest transaction date held, or None before the first sync"""
+        snapshot = self._snapshot
+        return self._watermark(snapshot.df if snapshot is not None else None)
+
+    @staticmethod
+    def _watermark(df: Optional[pd.DataFrame]) -> Optional[pd.Timestamp]:
+        if df is None or df.empty:
+            return None
+        return df['Date'].max()
+
+    def snapshot(self) -> TransactionSnapshot:
+        """Return the current frame and views, loading them first if missing; expired ones are refreshed in the background"""
+        return self._get()
+
+    def get(self) -> pd.DataFrame:
+        """Return the cached frame; use snapshot() to read views alongside it"""
+        return self.snapshot().df
+
+    def resync(self):
+        """Refetch the whole history now, picking up rows edited or deleted upstream"""
+        with self._lock:
+            with profiling.span('sync', store=self.name, full=True):
+                self._sync(full=True)
+
+    def _sync(self, full: bool = False):
+        # Readers keep the old snapshot until the new frame and all its views are complete
+        snapshot = self._snapshot
+        first_load = snapshot is None
+        if first_load:
+            df = self.log.read() if self.log else pd.DataFrame()
+        else:
+            df = snapshot.df
+
+        watermark = self._watermark(df)
+        since = watermark.strftime('%Y-%m-%d') if watermark is not None and not full else None
+        try:
+            fetched = self.loader(since)
+        except LoadError as e:
+            logger.warning("Syncing %s failed: %s", self.name, e)
+            if first_load and df.empty:
+                # Nothing to serve yet; stay unloaded so the next read retries rather than caching an empty frame
+                return
+            fetched = None
+        if fetched is None:
+            # Unchanged since the loader's last answer for this since, or failed with data held
+            fetched = pd.DataFrame()
+        with profiling.span('canonicalize', rows=len(fetched)):
+            fetched = canonicalize(fetched)
+
+        # Rows from before the watermark mean the loader returned the whole history
+        full_history = since is None or (not fetched.empty and fetched['Date'].min() < watermark)
+        new_rows = diff_new_rows(df, fetched, None if full_history else watermark)
+        # An empty fetch says nothing about held rows; otherwise every one must be matched in a full fetch
+        replaced = full_history and not fetched.empty and len(fetched) - len(new_rows) != len(df)
+
+        if replaced:
+            df = concat_transactions([fetched])
+        elif not new_rows.empty:
+            df = concat_transactions([df, new_rows])
+
+        rebuilt = first_load or replaced
+        views = self._views
+        if rebuilt or not new_rows.empty:
+            views = {name: copy.copy(view) for name, view in views.items()}
+            for view in views.values():
+                if rebuilt:
+                    view.rebuild(df)
+                else:
+                    view.add(new_rows)
+
+        # Persist only once every piece of new state is built, so a failure above leaves
+        # nothing behind for the retry to append a second time
+        if self.log and replaced:
+            self.log.replace(df)
+        elif self.log and not new_rows.empty:
+            self.log.append(new_rows)
+        self._views = views
+        self._snapshot = TransactionSnapshot(df, views)
+        # Only a changed frame bumps the version, so downstream caches stay warm
+        if rebuilt or not new_rows.empty:
+            self.version += 1
+        self._loaded_at = time.monotonic()
+
+
+class BudgetStore(SharedCache):
+    """Whole budget document held in memory and indexed by YYYY-MM month.
+
+    The document is downloaded once per TTL and every month lookup, range and
+    listing is served from memory.
+    """
+
+    name = 'budget'
+
+    def __init__(self, loader: Callable[[], Optional[Dict]], ttl: float = DEFAULT_TTL_SECONDS,
+                 stale_while_revalidate: bool = STALE_WHILE_REVALIDATE):
+        super().__init__(ttl, stale_while_revalidate)
+        self.loader = loader
+        self._document: Optional[Dict[str, Dict[str, float]]] = None
+
+    def _value(self):
+        return self._document
+
+    def _empty(self):
+        return {}
+
+    def get(self) -> Dict[str, Dict[str, float]]:
+        """Return the cached document, loading it first if missing; an expired one is refreshed in the background"""
+        return self._get()
+
+    def _sync(self):
+        try:
+            document = self.loader()
+        except LoadError as e:
+            logger.warning("Loading %s failed: %s", self.name, e)
+            if self._document is None:
+                # Stay unloaded so the next read retries
+                return
+            # Keep serving the last good document until the TTL passes again
+            document = None
+        # None means unchanged since the last load
+        if document is not None:
+            changed = document != self._document
+            self._document = document
+            if changed:
+                self.version += 1
+        self._loaded_at = time.monotonic()
+
+    def get_month(self, month: str) -> Dict[str, float]:
+        """Budget for one YYYY-MM month, empty if none is set"""
+        return dict(self.get().get(month, {}))
+
+    def months(self) -> list:
+        """Months that have a budget, oldest first"""
+        return sorted(self.get())
+
+    def get_range(self, start: str, end: str) -> Dict[str, Dict[str, float]]:
+        """Budgets for every month from start to end inclusive that has one"""
+        document = self.get()
+        return {month: dict(document[month]) for month in sorted(document) if start <= month <= end}
+
+
+def load_concurrently(*caches: SharedCache):
+    """Load every cache that holds nothing yet in parallel, so cold upstream round trips overlap"""
+    missing = [cache for cache in caches if cache._value() is None]
+    if len(missing) < 2:
+        return
+    with ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix='goblin-load') as pool:
+        # list() re-raises the first loader error here rather than losing it in the pool
+        list(pool.map(lambda cache: cache.refresh(force=False), missing))
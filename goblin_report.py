@@ -0,0 +1,112 @@
+"""Compute monthly budget summaries without Streamlit and write them to a file.
+
+Run from the repository root:
+
+    python goblin_report.py --start 2024-01 --end 2025-12 --output report.parquet [--test] [--workers 4]
+
+Transactions and the budget come from the Vulkan API (VULKAN_API_URL and
+WELL_API_KEY), or from test/ with --test, or from --transactions/--budget
+files. Each month is summarised in its own worker process and the results are
+written as one table with a Month column, in the format given by --format or
+the output file's extension (csv, json or parquet).
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from budget_core import SUMMARY_COLUMNS, summarize_month, with_budget_placeholders
+from data_store import canonicalize
+from vulkan_api import VulkanAPI, VulkanAPIError, parse_transactions_csv
+
+FORMATS = ['csv', 'json', 'parquet']
+
+
+def month_range(start: str, end: str) -> list:
+    """Every YYYY-MM month from start to end inclusive"""
+    return [str(month) for month in pd.period_range(start=start, end=end, freq='M')]
+
+
+def load_sources(args):
+    """(transactions, budget document) from the API or from local files"""
+    if args.test or args.transactions:
+        with open(args.budget or 'test/testbudget.json') as f:
+            budget = json.load(f)
+        return parse_transactions_csv(args.transactions or 'test/testout.csv'), budget
+
+    api = VulkanAPI()
+    try:
+        # Raise on each failure; last_error alone would be cleared by the next successful fetch
+        return api.get_transactions(raise_errors=True), api.get_budget_document(raise_errors=True)
+    except VulkanAPIError as e:
+        raise SystemExit(str(e))
+
+
+def summarize(job):
+    """Worker entry point: the summary for one (month, transactions, budget) job"""
+    month, rows, budget_dict = job
+    summary = with_budget_placeholders(summarize_month(rows, budget_dict), budget_dict)
+    summary = summary.rename_axis(['Category', 'SubCategory']).reset_index()
+    summary.insert(0, 'Month', month)
+    return summary
+
+
+def build_report(transactions: pd.DataFrame, budget: dict, months: list, workers=None) -> pd.DataFrame:
+    """Summaries for every month in months, computed across a process pool, as one flat table"""
+    transactions = canonicalize(transactions)
+    by_month = dict(tuple(transactions.groupby('Month', observed=True))) if not transactions.empty else {}
+    jobs = [(month, by_month.get(month, transactions.iloc[:0]), budget.get(month, {})) for month in months]
+
+    if workers == 1 or len(jobs) < 2:
+        summaries = [summarize(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(summarize, jobs))
+
+    summaries = [summary for summary in summaries if not summary.empty]
+    if not summaries:
+        return pd.DataFrame(columns=['Month', 'Category', 'SubCategory'] + SUMMARY_COLUMNS)
+    return pd.concat(summaries, ignore_index=True)
+
+
+def write_report(report: pd.DataFrame, path: str, fmt: str):
+    if fmt == 'csv':
+        report.to_csv(path, index=False)
+    elif fmt == 'json':
+        report.to_json(path, orient='records', indent=2)
+    else:
+        report.to_parquet(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--start', required=True, help='First month, YYYY-MM')
+    parser.add_argument('--end', help='Last month, YYYY-MM (default: --start)')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--format', choices=FORMATS, help='Default: from the output extension')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--test', action='store_true', help='Use the test data in test/')
+    parser.add_argument('--transactions', help='Transactions CSV to use instead of the API')
+    parser.add_argument('--budget', help='Budget JSON to use with --transactions or --test')
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt not in FORMATS:
+        parser.error(f"cannot tell the format from {args.output}; pass --format")
+    if args.transactions and not args.budget:
+        parser.error("--transactions needs --budget")
+    if args.budget and not (args.transactions or args.test):
+        parser.error("--budget needs --transactions or --test; the API supplies its own budget")
+
+    months = month_range(args.start, args.end or args.start)
+    transactions, budget = load_sources(args)
+    report = build_report(transactions, budget, months, args.workers)
+    write_report(report, args.output, fmt)
+    print(f"Wrote {len(report)} rows for {len(months)} months to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
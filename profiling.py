@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger('goblin.perf')
+
+# Process-wide totals per stage and per cache, exported by write_metrics
+_stage_totals = {}
+_cache_totals = {}
+_totals_lock = threading.Lock()
+
+# Spans and cache lookups of the script run executing on this thread, for the debug panel
+_run = threading.local()
+
+_enabled = False
+_metrics_path: Optional[str] = None
+
+
+def enable(metrics_path: Optional[str] = None):
+    """Emit spans as JSON log lines on stderr and, if given, keep a metrics file up to date"""
+    global _enabled, _metrics_path
+    _metrics_path = metrics_path
+    if _enabled:
+        return
+    _enabled = True
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def start_run():
+    """Forget the spans of this thread's previous script run"""
+    _run.spans = []
+
+
+def run_spans() -> list:
+    """Spans and cache lookups recorded on this thread since start_run"""
+    return list(getattr(_run, 'spans', []))
+
+
+def _record(event: dict):
+    spans = getattr(_run, 'spans', None)
+    if spans is not None:
+        spans.append(event)
+    if _enabled:
+        logger.info(json.dumps(event, default=str))
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """Time a pipeline stage (fetch, parse, aggregate, render, ...) with optional context fields"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        with _totals_lock:
+            count, total = _stage_totals.get(stage, (0, 0.0))
+            _stage_totals[stage] = (count + 1, total + seconds)
+        _record({'event': 'span', 'stage': stage, 'ms': round(seconds * 1000, 3), **fields})
+
+
+def cache_lookup(cache: str, hit: bool):
+    """Count a hit or miss on one of the dashboard's caches"""
+    with _totals_lock:
+        hits, misses = _cache_totals.get(cache, (0, 0))
+        _cache_totals[cache] = (hits + 1, misses) if hit else (hits, misses + 1)
+    _record({'event': 'cache', 'cache': cache, 'hit': hit})
+
+
+def metrics_text() -> str:
+    """Process totals in the Prometheus text exposition format"""
+    with _totals_lock:
+        stages = dict(_stage_totals)
+        caches = dict(_cache_totals)
+    lines = [
+        '# HELP goblin_stage_seconds_total Time spent in each pipeline stage.',
+        '# TYPE goblin_stage_seconds_total counter',
+    ]
+    lines += [f'goblin_stage_seconds_total{{stage="{stage}"}} {total:.6f}' for stage, (_, total) in sorted(stages.items())]
+    lines += [
+        '# HELP goblin_stage_runs_total Number of times each pipeline stage ran.',
+        '# TYPE goblin_stage_runs_total counter',
+    ]
+    lines += [f'goblin_stage_runs_total{{stage="{stage}"}} {count}' for stage, (count, _) in sorted(stages.items())]
+    lines += [
+        '# HELP goblin_cache_lookups_total Cache lookups by cache and result.',
+        '# TYPE goblin_cache_lookups_total counter',
+    ]
+    for cache, (hits, misses) in sorted(caches.items()):
+        lines.append(f'goblin_cache_lookups_total{{cache="{cache}",result="hit"}} {hits}')
+        lines.append(f'goblin_cache_lookups_total{{cache="{cache}",result="miss"}} {misses}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics():
+    """Rewrite the metrics file, if one was configured, for a local scraper to read"""
+    if not _metrics_path:
+        return
+    os.makedirs(os.path.dirname(_metrics_path) or '.', exist_ok=True)
+    tmp_path = _metrics_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(metrics_text())
+    os.replace(tmp_path, _metrics_path)
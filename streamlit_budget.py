@@ -1,33 +1,93 @@
 import pandas as pd
 import streamlit as st
-import plotly.express as px
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import base64
 from datetime import datetime, date
 import calendar
 import json
 import os
 import sys
-from vulkan_api import VulkanAPI
+import threading
+import profiling
+from vulkan_api import VulkanAPI, VulkanAPIError, parse_transactions_csv
+from budget_core import (AggregateCube, SearchIndex, TransactionIndex, credit_mask, display_frame, empty_summary,
+                         income_and_spend, pounds, summarize_actuals, summarize_month, transaction_page, trend_summary,
+                         with_budget_placeholders, EXCLUDED_CATEGORIES, INCOME_CATEGORIES, TRANSACTION_COLUMNS)
+from data_store import CACHE_DIR, BudgetStore, LoadError, TransactionLog, TransactionStore, load_concurrently
+from concurrent.futures import ThreadPoolExecutor
 
+@st.cache_resource
 def get_base64(image_path):
+    # Encoded once per process rather than on every script run
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode()
 
-@st.cache_data
-def load_and_process_data(selected_date=None, use_api=True):
-    current_month = selected_date.strftime("%Y-%m") if selected_date else datetime.now().strftime("%Y-%m")
-    
+@st.cache_resource
+def get_api():
+    # One pooled client per process so connections are kept alive between reruns
+    return VulkanAPI()
+
+def load_api_transactions(since=None):
+    # A 304 comes back as None, which the store takes as nothing new; a failure must not look like an empty vault
+    try:
+        return get_api().get_transactions(since, if_changed=True, raise_errors=True)
+    except VulkanAPIError as e:
+        raise LoadError(str(e)) from e
+
+def load_api_budget():
+    try:
+        return get_api().get_budget_document(if_changed=True, raise_errors=True)
+    except VulkanAPIError as e:
+        raise LoadError(str(e)) from e
+
+@st.cache_resource
+def get_transaction_store(use_api=True):
+    # One store per process and mode, shared by every widget and session
     if use_api:
-        # API-based data loading
-        api = VulkanAPI()
-        df = api.get_transactions()
-        budget_dict = api.get_budget(current_month)
+        # Incremental sync against the API, persisted to an append-only local log
+        log = TransactionLog(os.path.join(CACHE_DIR, 'transactions'))
+        store = TransactionStore(load_api_transactions, log=log)
     else:
-        # Local file-based data loading
-        df = pd.read_csv('test/testout.csv')
-        with open('test/testbudget.json', 'r') as f:
-            budget_data = json.load(f)
-        budget_dict = budget_data.get(current_month, {})
+        # Test data has no since support, so every sync diffs a full read
+        log = TransactionLog(os.path.join(CACHE_DIR, 'test'))
+        store = TransactionStore(lambda since=None: load_test_transactions(), log=log)
+    # Per-month sums over every transaction, for month navigation and trends
+    store.attach('cube', AggregateCube())
+    # (month, category) -> row positions for the "See Transactions" drill-down
+    store.attach('index', TransactionIndex())
+    # Word index over Name and Notes for the transaction search boxes
+    store.attach('search', SearchIndex())
+    return store
+
+def load_test_transactions():
+    with profiling.span('parse', path='test/testout.csv'):
+        return parse_transactions_csv('test/testout.csv')
+
+@st.cache_resource
+def get_prefetch_pool():
+    # Background workers that warm the summary cache for neighbouring months
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='goblin-prefetch')
+
+def load_test_budget():
+    with open('test/testbudget.json', 'r') as f:
+        return json.load(f)
+
+@st.cache_resource
+def get_budget_store(use_api=True):
+    # Whole budget document loaded once per TTL and shared like the transaction store
+    if use_api:
+        return BudgetStore(load_api_budget)
+    return BudgetStore(load_test_budget)
+
+# Marks, per thread, that load_and_process_data's body ran, which it only does on a cache miss
+_summary_misses = threading.local()
+
+@st.cache_data(show_spinner=False)
+def load_and_process_data(selected_date=None, use_api=True, data_version=0, budget_version=0):
+    # data_version and budget_version only key the cache so store refreshes invalidate old results
+    _summary_misses.missed = True
+    current_month = selected_date.strftime("%Y-%m") if selected_date else datetime.now().strftime("%Y-%m")
+    budget_dict = get_budget_store(use_api).get_month(current_month)
     
     # Check if budget exists
     has_budget = len(budget_dict) > 0
@@ -35,84 +95,28 @@ def load_and_process_data(selected_date=None, use_api=True):
     # Calculate total budget from source (not just categories with transactions)
     total_budget = sum(budget_dict.values()) if budget_dict else 0
     
+    with profiling.span('aggregate', month=current_month):
+        return _process_month(selected_date, current_month, use_api, has_budget, budget_dict)
+
+def _process_month(selected_date, current_month, use_api, has_budget, budget_dict):
+    if not selected_date:
+        # No month picked: summarise the whole history straight from the frame
+        return summarize_month(get_transaction_store(use_api).get(), budget_dict), has_budget, budget_dict
+
+    # A month is just a slice of the precomputed cube, no reload or re-pivot
+    cube = get_transaction_store(use_api).snapshot().views['cube']
+    actual = cube.month(current_month)['Amount']
     # Filter out 'Fun' category
-    if not df.empty:
-        df = df[df['Category'] != 'Fun']
-    
-    # Filter data by selected month if provided
-    if selected_date and not df.empty:
-        # Convert Date column to datetime if it's not already
-        df['Date'] = pd.to_datetime(df['Date'])
-        # Filter for selected month and year
-        year, month = selected_date.year, selected_date.month
-        df = df[(df['Date'].dt.year == year) & (df['Date'].dt.month == month)]
-        # Convert back to string format for consistency
-        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    actual = actual[~actual.index.get_level_values(0).isin(EXCLUDED_CATEGORIES)]
     
     # Return empty DataFrame if no data found
-    if df.empty:
-        empty_df = pd.DataFrame(columns=['Budget', 'Actual', 'Remaining', 'Percentage', 'Overspend', 'Notes'], 
-                               index=pd.MultiIndex.from_tuples([], names=['Category', 'SubCategory']))
-        return empty_df, has_budget, budget_dict
-    
-    # Create pivot table
-    pivot_table = df.pivot_table(
-        index=['Category', 'SubCategory'], 
-        values='Amount', 
-        aggfunc='sum'
-    ).rename(columns={'Amount': 'Actual'})
-    
-    # Initialize columns
-    pivot_table['Budget'] = 0.0
-    pivot_table['Overspend'] = pivot_table['Actual'] - pivot_table['Budget']
-    pivot_table['Notes'] = ""
-    
-    # Add totals
-    def add_totals(group):
-        totals = group.sum(numeric_only=True).to_frame().T
-        totals.index = pd.MultiIndex.from_tuples([(group.index[0][0], 'Total')])
-        totals['Notes'] = ""
-        return pd.concat([group, totals])
-    
-    final_view = pivot_table.groupby(level=0, sort=False).apply(add_totals).reset_index(level=0, drop=True)
-    
-    # Apply budget amounts to category totals from API or local data
-    for category, budget in budget_dict.items():
-        total_mask = final_view.index.get_level_values(1) == 'Total'
-        category_mask = final_view.index.get_level_values(0) == category
-        combined_mask = total_mask & category_mask
-        if combined_mask.any():
-            final_view.loc[combined_mask, 'Budget'] = budget
-    
-    # Calculate overspend only for total rows
-    final_view['Overspend'] = 0.0
-    total_rows_mask = final_view.index.get_level_values(1) == 'Total'
-    final_view.loc[total_rows_mask, 'Overspend'] = final_view.loc[total_rows_mask, 'Actual'] - final_view.loc[total_rows_mask, 'Budget']
-    
-    # Add remaining budget and percentage
-    final_view['Remaining'] = 0.0
-    final_view['Percentage'] = 0.0
-    final_view.loc[total_rows_mask, 'Remaining'] = final_view.loc[total_rows_mask, 'Budget'] - final_view.loc[total_rows_mask, 'Actual']
-    # Avoid division by zero - simpler approach
-    total_rows = final_view.loc[total_rows_mask]
-    for idx in total_rows.index:
-        budget = final_view.loc[idx, 'Budget']
-        actual = final_view.loc[idx, 'Actual']
-        if budget > 0:
-            final_view.loc[idx, 'Percentage'] = (actual / budget * 100).round(1)
-    
-    # Reorder columns
-    final_view = final_view[['Budget', 'Actual', 'Remaining', 'Percentage', 'Overspend', 'Notes']]
-    
-    return final_view, has_budget, budget_dict
-
-def main():
-    # Check for test mode flag
-    use_api = '--test' not in sys.argv
-    
-    # Set page configuration
-    st.set_page_config(layout="wide", page_title="Goblin", page_icon="goblin-mascot.png")
+    if actual.empty:
+        return empty_summary(), has_budget, budget_dict
     
+    # Subtotals, budget join and Remaining/Percentage/Overspend in one vectorized pass
+    return summarize_actuals(actual, budget_dict), has_budget, budget_dict
+
+def render_header():
     # Reduce top margin of main content
     st.markdown("""
     <style>
@@ -134,8 +138,9 @@ def main():
         <h1 style="margin: 0;">Goblin</h1>
     </div>
     """.format(get_base64("goblin-mascot.png")), unsafe_allow_html=True)
-    
-    # Month selector
+
+def render_month_selector():
+    # Changing month affects every region, so navigation reruns the whole app
     if 'selected_date' not in st.session_state:
         st.session_state.selected_date = date.today().replace(day=1)
     
@@ -160,41 +165,44 @@ def main():
             else:
                 st.session_state.selected_date = st.session_state.selected_date.replace(month=st.session_state.selected_date.month + 1)
             st.rerun()
-    
-    # Load and process data with selected month
-    df, has_budget, budget_dict = load_and_process_data(st.session_state.selected_date, use_api=use_api)
-    
-    # Show budget warning if no budget detected
-    if not has_budget:
-        st.error("🚨 No budget detected for selected month - showing $0 for all categories")
-    
-    # Check if no data found for selected month
-    no_transaction_data = df.empty
-    if no_transaction_data:
-        st.warning(f"No transaction data found for {calendar.month_name[st.session_state.selected_date.month]} {st.session_state.selected_date.year}")
-        # Create a minimal DataFrame with budget categories for display
-        if budget_dict:
-            # Create placeholder rows for each budget category
-            placeholder_data = []
-            for category in budget_dict:
-                placeholder_data.append({
-                    'Budget': budget_dict[category],
-                    'Actual': 0.0,
-                    'Remaining': budget_dict[category],
-                    'Percentage': 0.0,
-                    'Overspend': 0.0,
-                    'Notes': ""
-                })
-            
-            df = pd.DataFrame(placeholder_data)
-            df.index = pd.MultiIndex.from_tuples(
-                [(cat, 'Total') for cat in budget_dict.keys()], 
-                names=['Category', 'SubCategory']
-            )
-        else:
-            st.error("No budget data available either - nothing to display")
-            return
-    
+
+def load_month_view(use_api):
+    # Each region reads its inputs from the shared caches, so a fragment rerun stays cheap
+    store = get_transaction_store(use_api)
+    budget_store = get_budget_store(use_api)
+    # On a cold start the transactions and budget downloads run side by side
+    load_concurrently(store, budget_store)
+    store.get()
+    budget_store.get()
+    # Other sessions and the prefetch threads miss on their own threads, so they cannot count as ours
+    _summary_misses.missed = False
+    df, has_budget, budget_dict = load_and_process_data(st.session_state.selected_date, use_api=use_api,
+                                                        data_version=store.version, budget_version=budget_store.version)
+    profiling.cache_lookup('load_and_process_data', hit=not _summary_misses.missed)
+    return df, has_budget, budget_dict
+
+def adjacent_months(selected_date):
+    # First days of the months either side of selected_date
+    previous_month = (selected_date - pd.DateOffset(months=1)).date()
+    next_month = (selected_date + pd.DateOffset(months=1)).date()
+    return [previous_month, next_month]
+
+def prefetch_month(ctx, month, **kwargs):
+    # Pool threads have no ScriptRunContext of their own; lend them the session's for the cached call
+    add_script_run_ctx(threading.current_thread(), ctx)
+    load_and_process_data(month, **kwargs)
+
+def prefetch_adjacent_months(use_api):
+    # Summarise the previous and next months off the script thread so Previous/Next hit a warm cache
+    store = get_transaction_store(use_api)
+    budget_store = get_budget_store(use_api)
+    pool = get_prefetch_pool()
+    ctx = get_script_run_ctx()
+    for month in adjacent_months(st.session_state.selected_date):
+        pool.submit(prefetch_month, ctx, month, use_api=use_api,
+                    data_version=store.version, budget_version=budget_store.version)
+
+def render_metrics(df, budget_dict):
     # Calculate overall totals
     total_rows = df.loc[df.index.get_level_values(1) == 'Total']
     total_actual = total_rows['Actual'].sum()
@@ -216,15 +224,19 @@ def main():
     with col4:
         total_percentage = (total_actual / sum(budget_dict.values()) * 100) if budget_dict and sum(budget_dict.values()) > 0 else 0
         st.metric("Budget Used", f"{total_percentage:.1f}%")
-    
-    st.divider()
-    
-    # Create tabs for Out, Budget, and In
-    tab_out, tab_budget, tab_in = st.tabs(["Out", "Budget", "In"])
-    
-    with tab_out:
-        # Create two columns layout for pie chart and category bars
-        col_bars, col_pie = st.columns([1, 1])
+
+@st.fragment
+def render_out_tab(use_api):
+    df, _, budget_dict = load_month_view(use_api)
+    df = with_budget_placeholders(df, budget_dict)
+    # Row positions from the indexes only hold for the frame they were published with
+    snapshot = get_transaction_store(use_api).snapshot()
+    transactions = snapshot.df
+    transaction_index = snapshot.views['index']
+    search_index = snapshot.views['search']
+    
+    # Create two columns layout for pie chart and category bars
+    col_bars, col_pie = st.columns([1, 1])
     
     with col_pie:
         st.markdown("## Spending Breakdown")
@@ -239,6 +251,8 @@ def main():
         
         # Create pie chart
         if not pie_data.empty:
+            # Plotly is only imported once there is a chart to draw
+            import plotly.express as px
             fig = px.pie(pie_data, values='Actual', names='Category', 
                         title='Total Spending by Category')
             
@@ -251,25 +265,20 @@ def main():
             )
             fig.update_layout(height=500)
             
-            st.plotly_chart(fig, width="stretch")
+            with profiling.span('render', element='spending_pie'):
+                st.plotly_chart(fig, width="stretch")
         
-        # Load all transactions to calculate credit spending
-        if use_api:
-            api_instance = VulkanAPI()
-            all_transactions = api_instance.get_transactions()
-        else:
-            all_transactions = pd.read_csv('test/testout.csv')
-        all_transactions['Date'] = pd.to_datetime(all_transactions['Date'])
+        # Use the shared transactions to calculate credit spending
+        all_transactions = transactions
         
-        # Filter for selected month and credit payments
-        year, month = st.session_state.selected_date.year, st.session_state.selected_date.month
+        # Filter for selected month and credit payments; both tests run on precomputed keys
+        current_month = st.session_state.selected_date.strftime("%Y-%m")
         credit_transactions = all_transactions[
-            (all_transactions['Date'].dt.year == year) & 
-            (all_transactions['Date'].dt.month == month) &
-            (all_transactions['PaymentMethod'].str.contains('Credit', case=False, na=False))
+            (all_transactions['Month'] == current_month).to_numpy() &
+            credit_mask(all_transactions)
         ]
         
-        total_credit_spending = credit_transactions['Amount'].sum()
+        total_credit_spending = pounds(credit_transactions['AmountPence'].sum())
         
         # Display total credit spending
         st.metric("Credit Pot", f"£{total_credit_spending:,.2f}")
@@ -277,15 +286,17 @@ def main():
         # Show credit transactions if any
         if not credit_transactions.empty:
             with st.expander("View Credit Transactions", expanded=False):
-                credit_display = credit_transactions[['Date', 'Name', 'Amount', 'SubCategory']].copy()
+                credit_display = display_frame(credit_transactions, ['Date', 'Name', 'Amount', 'SubCategory'])
                 credit_display = credit_display.iloc[::-1]  # Most recent first
-                st.dataframe(credit_display.style.format({'Amount': '£{:,.2f}'}), width="stretch", hide_index=True)
+                with profiling.span('render', element='credit_transactions'):
+                    st.dataframe(credit_display.style.format({'Amount': '£{:,.2f}'}), width="stretch", hide_index=True)
     
     with col_bars:
         st.markdown("## Category Details")
         
-        # Create collapsible categories with summary bars
-        df_display = df.reset_index()
+        # Create collapsible categories with summary bars; budget placeholders name their index
+        # levels and real summaries do not, so drop the names to always get level_0/level_1
+        df_display = df.rename_axis([None, None]).reset_index()
         
         # If Category is not a column, extract it from the original index
         if 'Category' not in df_display.columns:
@@ -364,26 +375,29 @@ def main():
                     category_display['Contribution'] = (category_display['Actual'] / actual * 100).round(1) if actual > 0 else 0
                     
                     # Show subcategory table with contribution
-                    st.dataframe(category_display.style.format({
-                        'Actual': '£{:,.2f}',
-                        'Contribution': '{:.1f}%'
-}), width="stretch", hide_index=True)
+                    with profiling.span('render', element='subcategory_table', category=category):
+                        st.dataframe(category_display.style.format({
+                            'Actual': '£{:,.2f}',
+                            'Contribution': '{:.1f}%'
+                        }), width="stretch", hide_index=True)
                     
-                    # Add "See Transactions" dropdown
-                    with st.expander("See Transactions", expanded=False):
-                        # Load original transaction data for this category
-                        if use_api:
-                            api_instance = VulkanAPI()
-                            transactions_df = api_instance.get_transactions()
-                        else:
-                            transactions_df = pd.read_csv('test/testout.csv')
-                        category_transactions = transactions_df[transactions_df['Category'] == category].copy()
-                        
-                        # Format and display transactions
-                        category_transactions = category_transactions[['Date', 'Name', 'Amount', 'SubCategory', 'PaymentMethod', 'Notes']].copy()
-                        category_transactions = category_transactions.iloc[::-1]
-                        
-                        st.dataframe(category_transactions.style.format({'Amount': '£{:,.2f}'}), width="stretch", hide_index=True)
+                    # Add "See Transactions" dropdown; its table is only built once the user opens it
+                    see_transactions = st.expander("See Transactions", expanded=False,
+                                                   key=f"see_transactions_{category}", on_change="rerun")
+                    if see_transactions.open:
+                        with see_transactions:
+                            # This month's transactions for the category, straight from the index
+                            current_month = st.session_state.selected_date.strftime("%Y-%m")
+                            query = st.text_input("Search", key=f"search_{category}", placeholder="Name or notes")
+                            positions = search_index.search(query, within=transaction_index.positions(current_month, category))
+                            category_transactions = transactions.iloc[positions]
+                            
+                            # Format and display transactions
+                            category_transactions = display_frame(category_transactions, ['Date', 'Name', 'Amount', 'SubCategory', 'PaymentMethod', 'Notes'])
+                            category_transactions = category_transactions.iloc[::-1]
+                            
+                            with profiling.span('render', element='category_transactions', category=category):
+                                st.dataframe(category_transactions.style.format({'Amount': '£{:,.2f}'}), width="stretch", hide_index=True)
             
             with col2:
                 # Show only colored status on the right
@@ -394,117 +408,262 @@ def main():
                         st.markdown(f"<span style='color:red; font-size:20px; font-weight:bold;'>£{abs(remaining):,.2f}</span><br><span style='color:red; font-size:14px;'>overspent</span>", unsafe_allow_html=True)
                 else:
                     st.write("No budget")
+
+@st.fragment
+def render_budget_tab(use_api):
+    st.markdown("## 📊 Budget Overview")
     
-    with tab_budget:
-        st.markdown("## 📊 Budget Overview")
+    # Get current month budget data
+    current_month = st.session_state.selected_date.strftime("%Y-%m")
+    budget_data = get_budget_store(use_api).get_month(current_month)
+    
+    if budget_data:
+        st.write(f"**Budget for {current_month}:**")
         
-        # Get current month budget data
-        current_month = st.session_state.selected_date.strftime("%Y-%m")
-        if use_api:
-            api = VulkanAPI()
-            budget_data = api.get_budget(current_month)
-        else:
-            with open('test/testbudget.json', 'r') as f:
-                all_budget_data = json.load(f)
-            budget_data = all_budget_data.get(current_month, {})
+        # Create two columns for budget display
+        col1, col2 = st.columns(2)
         
-        if budget_data:
-            st.write(f"**Budget for {current_month}:**")
+        with col1:
+            st.markdown("### Budget Categories")
+            # Create a DataFrame for better display
+            budget_df = pd.DataFrame(list(budget_data.items()), columns=['Category', 'Amount'])
+            budget_df = budget_df.sort_values('Amount', ascending=False)
             
-            # Create two columns for budget display
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("### Budget Categories")
-                # Create a DataFrame for better display
-                budget_df = pd.DataFrame(list(budget_data.items()), columns=['Category', 'Amount'])
-                budget_df = budget_df.sort_values('Amount', ascending=False)
-                
-                # Display budget table
-                st.dataframe(
-                    budget_df.style.format({'Amount': '£{:,.2f}'}),
-                    width="stretch",
-                    hide_index=True
-                )
+            # Display budget table
+            st.dataframe(
+                budget_df.style.format({'Amount': '£{:,.2f}'}),
+                width="stretch",
+                hide_index=True
+            )
+        
+        with col2:
+            st.markdown("### Budget Summary")
+            total_monthly_budget = sum(budget_data.values())
+            st.metric("Total Monthly Budget", f"£{total_monthly_budget:,.2f}")
             
-            with col2:
-                st.markdown("### Budget Summary")
-                total_monthly_budget = sum(budget_data.values())
-                st.metric("Total Monthly Budget", f"£{total_monthly_budget:,.2f}")
-                
-                # Show budget breakdown
-                st.markdown("### Top Categories")
-                top_categories = budget_df.head(5)  # Top 5 categories
-                for _, row in top_categories.iterrows():
-                    percentage = (row['Amount'] / total_monthly_budget * 100) if total_monthly_budget > 0 else 0
-                    st.write(f"**{row['Category']}**: £{row['Amount']:,.2f} ({percentage:.1f}%)")
-        else:
-            st.warning(f"No budget data found for {current_month}")
+            # Show budget breakdown
+            st.markdown("### Top Categories")
+            top_categories = budget_df.head(5)  # Top 5 categories
+            for _, row in top_categories.iterrows():
+                percentage = (row['Amount'] / total_monthly_budget * 100) if total_monthly_budget > 0 else 0
+                st.write(f"**{row['Category']}**: £{row['Amount']:,.2f} ({percentage:.1f}%)")
+    else:
+        st.warning(f"No budget data found for {current_month}")
+
+def select_trend_period(use_api, cube, key):
+    # Trailing 12 months up to the selected month, or any calendar year with data or a budget
+    end_month = st.session_state.selected_date.strftime("%Y-%m")
+    months = cube.months() + get_budget_store(use_api).months()
+    years = sorted({month[:4] for month in months}, reverse=True)
+    period = st.selectbox("Period", ["Last 12 months"] + years, key=key)
+    if period == "Last 12 months":
+        start_month = (st.session_state.selected_date - pd.DateOffset(months=11)).strftime("%Y-%m")
+        return start_month, end_month
+    return f"{period}-01", f"{period}-12"
+
+@st.fragment
+def render_trends_tab(use_api):
+    st.markdown("## 📈 Trends")
+    cube = get_transaction_store(use_api).snapshot().views['cube']
+    start_month, end_month = select_trend_period(use_api, cube, "trend_period")
+    budgets = get_budget_store(use_api).get_range(start_month, end_month)
+    
+    # Both views read the cube's running per-month totals, so a 5-year range costs about the same as one month
+    with profiling.span('aggregate', view='trends', start=start_month, end=end_month):
+        summary = trend_summary(cube, budgets, start_month, end_month)
+        monthly = income_and_spend(cube, budgets, start_month, end_month)
+    
+    if summary.empty:
+        st.warning(f"No spending or budget found from {start_month} to {end_month}")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Budget", f"£{summary['Budget'].sum():,.2f}")
+    with col2:
+        st.metric("Total Spent", f"£{summary['Actual'].sum():,.2f}")
+    with col3:
+        st.metric("Remaining", f"£{summary['Remaining'].sum():,.2f}")
+    
+    import plotly.express as px
+    
+    col_categories, col_months = st.columns([1, 1])
+    with col_categories:
+        st.markdown("### Budget vs Actual by Category")
+        by_category = summary.reset_index().melt(id_vars='Category', value_vars=['Budget', 'Actual'],
+                                                 var_name='Series', value_name='Amount')
+        fig = px.bar(by_category, x='Category', y='Amount', color='Series', barmode='group')
+        fig.update_traces(hovertemplate='£%{y:,.2f}<extra></extra>')
+        fig.update_layout(height=400, legend_title_text='')
+        with profiling.span('render', element='trend_categories'):
+            st.plotly_chart(fig, width="stretch")
     
-    with tab_in:
-                st.markdown("## 💰 Income")
-                st.write("Income tracking coming soon...")
-                # TODO: Add income tracking functionality here
+    with col_months:
+        st.markdown("### Spending per Month")
+        per_month = monthly.reset_index().melt(id_vars='Month', value_vars=['Budget', 'Spend'],
+                                               var_name='Series', value_name='Amount')
+        fig = px.line(per_month, x='Month', y='Amount', color='Series', markers=True)
+        fig.update_traces(hovertemplate='£%{y:,.2f}<extra></extra>')
+        fig.update_layout(height=400, legend_title_text='')
+        with profiling.span('render', element='trend_months'):
+            st.plotly_chart(fig, width="stretch")
     
-    # Add footer with raw data buttons
-    st.divider()
+    st.dataframe(
+        summary.reset_index(),
+        column_config={
+            'Budget': st.column_config.NumberColumn(format="£%.2f"),
+            'Actual': st.column_config.NumberColumn(format="£%.2f"),
+            'Remaining': st.column_config.NumberColumn(format="£%.2f"),
+            'Percentage': st.column_config.NumberColumn("Budget Used", format="%.1f%%"),
+        },
+        width="stretch",
+        hide_index=True
+    )
+
+@st.fragment
+def render_in_tab(use_api):
+    st.markdown("## 💰 Income")
+    cube = get_transaction_store(use_api).snapshot().views['cube']
+    start_month, end_month = select_trend_period(use_api, cube, "income_period")
+    budgets = get_budget_store(use_api).get_range(start_month, end_month)
+    
+    with profiling.span('aggregate', view='income', start=start_month, end=end_month):
+        monthly = income_and_spend(cube, budgets, start_month, end_month)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Income", f"£{monthly['Income'].sum():,.2f}")
+    with col2:
+        st.metric("Spent", f"£{monthly['Spend'].sum():,.2f}")
+    with col3:
+        st.metric("Net", f"£{monthly['Net'].sum():,.2f}")
+    
+    if not monthly['Income'].any():
+        st.info(f"No transactions in the {', '.join(INCOME_CATEGORIES)} category from {start_month} to {end_month}")
+    
+    import plotly.express as px
+    
+    per_month = monthly.reset_index().melt(id_vars='Month', value_vars=['Income', 'Spend'],
+                                           var_name='Series', value_name='Amount')
+    fig = px.bar(per_month, x='Month', y='Amount', color='Series', barmode='group')
+    fig.update_traces(hovertemplate='£%{y:,.2f}<extra></extra>')
+    fig.update_layout(height=400, legend_title_text='')
+    with profiling.span('render', element='income_months'):
+        st.plotly_chart(fig, width="stretch")
+    
+    st.dataframe(
+        monthly.reset_index()[['Month', 'Income', 'Spend', 'Net']],
+        column_config={column: st.column_config.NumberColumn(format="£%.2f") for column in ['Income', 'Spend', 'Net']},
+        width="stretch",
+        hide_index=True
+    )
+
+# Page sizes offered by the raw transaction viewer
+RAW_PAGE_SIZES = [25, 50, 100, 250]
+
+def render_transaction_viewer(use_api):
+    # Filter, sort and page on the server; the browser only ever receives the visible page
+    snapshot = get_transaction_store(use_api).snapshot()
+    transactions = snapshot.df
+    if transactions.empty:
+        st.warning("No transactions available")
+        return
+    first_day = transactions['Date'].min().date()
+    last_day = transactions['Date'].max().date()
     
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        date_range = st.date_input("Date range", value=(first_day, last_day), min_value=first_day,
+                                   max_value=last_day, key="raw_date_range")
+    with col2:
+        categories = st.multiselect("Category", list(transactions['Category'].cat.categories), key="raw_categories")
+    with col3:
+        payment_methods = st.multiselect("Payment method", list(transactions['PaymentMethod'].cat.categories),
+                                         key="raw_payment_methods")
+    with col4:
+        query = st.text_input("Search name and notes", key="raw_search")
+    
+    col5, col6, col7 = st.columns(3)
+    with col5:
+        sort_by = st.selectbox("Sort by", TRANSACTION_COLUMNS, key="raw_sort_by")
+    with col6:
+        page_size = st.selectbox("Rows per page", RAW_PAGE_SIZES, index=1, key="raw_page_size")
+    with col7:
+        descending = st.toggle("Newest / largest first", value=True, key="raw_descending")
+    
+    # The range picker holds a single date while the user is choosing the end
+    start = date_range[0] if len(date_range) > 0 else None
+    end = date_range[1] if len(date_range) > 1 else None
+    
+    # Keep the requested page inside the filtered result before drawing the page picker
+    page = max(int(st.session_state.get('raw_page', 1)), 1)
+    filters = dict(page_size=page_size, sort_by=sort_by, ascending=not descending, start=start, end=end,
+                   categories=categories, payment_methods=payment_methods,
+                   positions=snapshot.views['search'].search(query))
+    page_rows, matched = transaction_page(transactions, page=page - 1, **filters)
+    page_count = max((matched + page_size - 1) // page_size, 1)
+    if page > page_count:
+        page = page_count
+        page_rows, matched = transaction_page(transactions, page=page - 1, **filters)
+    st.session_state.raw_page = page
+    
+    with profiling.span('render', element='raw_transactions', rows=len(page_rows)):
+        st.dataframe(
+            page_rows,
+            column_config={'Amount': st.column_config.NumberColumn(format="£%.2f")},
+            width="stretch",
+            hide_index=True
+        )
+    
+    col8, col9 = st.columns([1, 3])
+    with col8:
+        st.number_input("Page", min_value=1, max_value=page_count, step=1, key="raw_page")
+    with col9:
+        first_row = (page - 1) * page_size + 1 if matched else 0
+        st.markdown(f"**Showing** {first_row}–{min(page * page_size, matched)} of {matched} matching transactions "
+                    f"({len(transactions)} in total, {first_day} to {last_day})")
+
+@st.fragment
+def render_raw_data_panel(use_api):
+    # Opening or closing the raw views only reruns this panel
     col1, col2, col3 = st.columns([1, 1, 1])
     
     with col1:
         if st.button("📊 View Raw Transactions", key="view_transactions"):
-            # Create transaction data for display
-            if use_api:
-                api_instance = VulkanAPI()
-                all_transactions = api_instance.get_transactions()
-            else:
-                all_transactions = pd.read_csv('test/testout.csv')
-            
-            # Format date and sort by date (newest first)
-            all_transactions['Date'] = pd.to_datetime(all_transactions['Date'])
-            all_transactions = all_transactions.sort_values('Date', ascending=False)
-            all_transactions['Date'] = all_transactions['Date'].dt.strftime('%Y-%m-%d')
-            
-            # Store in session state for the modal
-            st.session_state.show_raw_transactions = all_transactions
-            st.session_state.show_raw_transactions_modal = True
-            st.rerun()
+            # Only the viewer's settings live in session state; rows are read from the shared store per page
+            st.session_state.show_raw_transactions = True
     
     with col2:
         if st.button("💰 View Raw Budget", key="view_budget"):
             # Create budget data for display
             current_month = st.session_state.selected_date.strftime("%Y-%m")
-            if use_api:
-                api = VulkanAPI()
-                budget_data = api.get_budget(current_month)
-            else:
-                with open('test/testbudget.json', 'r') as f:
-                    all_budget_data = json.load(f)
-                budget_data = all_budget_data.get(current_month, {})
+            budget_data = get_budget_store(use_api).get_month(current_month)
             
-            # Store in session state for the modal
+            # Store in session state for the modal, drawn further down this same fragment run
             st.session_state.show_raw_budget = budget_data
             st.session_state.show_raw_budget_modal = True
-            st.rerun()
     
     with col3:
+        if st.button("🔄 Refresh Data", key="refresh_data"):
+            # Sync new rows and reload the budget now, rather than serving the cached copies meanwhile
+            get_transaction_store(use_api).refresh()
+            get_budget_store(use_api).refresh()
+            # New data changes every region, so rerun the whole app
+            st.rerun()
+        if st.button("🔁 Full Resync", key="resync_data",
+                     help="Refetch every transaction to pick up ones edited or deleted upstream"):
+            get_transaction_store(use_api).resync()
+            get_budget_store(use_api).refresh()
+            st.rerun()
         st.markdown(f"<small style='color: gray;'>Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</small>", unsafe_allow_html=True)
     
     # Modals for raw data display
-    if st.session_state.get('show_raw_transactions_modal', False):
-        st.session_state.show_raw_transactions_modal = False
+    if st.session_state.get('show_raw_transactions', False):
         with st.expander("📊 Raw Transaction Data", expanded=True):
-            transactions_df = st.session_state.show_raw_transactions
-            st.dataframe(
-                transactions_df.style.format({'Amount': '£{:,.2f}'}),
-                width="stretch",
-                height=600
-            )
-            st.markdown(f"**Total Transactions:** {len(transactions_df)}")
-            st.markdown(f"**Date Range:** {transactions_df['Date'].min()} to {transactions_df['Date'].max()}")
-            if st.button("Close Transactions", key="close_transactions"):
-                del st.session_state.show_raw_transactions
-                st.rerun()
+            render_transaction_viewer(use_api)
+            # Closing in a callback keeps the viewer from being drawn once more on the way out
+            st.button("Close Transactions", key="close_transactions",
+                      on_click=lambda: st.session_state.update(show_raw_transactions=False))
     
     if st.session_state.get('show_raw_budget_modal', False):
         st.session_state.show_raw_budget_modal = False
@@ -523,7 +682,90 @@ def main():
                 st.warning("No budget data found for selected month")
             if st.button("Close Budget", key="close_budget"):
                 del st.session_state.show_raw_budget
-                st.rerun()
+
+def render_profile_panel():
+    # Hidden debug panel, only drawn when started with --profile
+    with st.sidebar:
+        st.markdown("## Performance")
+        events = profiling.run_spans()
+        spans = pd.DataFrame([event for event in events if event['event'] == 'span'])
+        if not spans.empty:
+            st.metric("Stage time this run", f"{spans['ms'].sum():,.1f} ms")
+            st.dataframe(spans.drop(columns='event').astype(str), width="stretch", hide_index=True)
+        lookups = pd.DataFrame([event for event in events if event['event'] == 'cache'])
+        if not lookups.empty:
+            st.markdown("### Cache lookups")
+            st.dataframe(lookups.groupby('cache')['hit'].agg(hits='sum', lookups='size').reset_index(),
+                         width="stretch", hide_index=True)
+        with st.expander("Process metrics", expanded=False):
+            st.code(profiling.metrics_text(), language="text")
+
+def main():
+    # Check for test mode flag
+    use_api = '--test' not in sys.argv
+    profile = '--profile' in sys.argv
+    if profile:
+        profiling.enable(os.getenv('GOBLIN_METRICS_FILE', os.path.join(CACHE_DIR, 'metrics.prom')))
+    profiling.start_run()
+    
+    # Set page configuration
+    st.set_page_config(layout="wide", page_title="Goblin", page_icon="goblin-mascot.png")
+    
+    render_header()
+    render_month_selector()
+    
+    # Load and process data with selected month
+    df, has_budget, budget_dict = load_month_view(use_api)
+    
+    # The API client only logs failures; surface the latest one to the user
+    if use_api and get_api().last_error:
+        st.error(get_api().last_error)
+    
+    # Show budget warning if no budget detected
+    if not has_budget:
+        st.error("🚨 No budget detected for selected month - showing $0 for all categories")
+    
+    # Check if no data found for selected month
+    if df.empty:
+        st.warning(f"No transaction data found for {calendar.month_name[st.session_state.selected_date.month]} {st.session_state.selected_date.year}")
+        if not budget_dict:
+            st.error("No budget data available either - nothing to display")
+            prefetch_adjacent_months(use_api)
+            if profile:
+                render_profile_panel()
+                profiling.write_metrics()
+            return
+        df = with_budget_placeholders(df, budget_dict)
+    
+    render_metrics(df, budget_dict)
+    
+    st.divider()
+    
+    # Create tabs for Out, Budget, Trends and In; interactive regions are fragments that rerun on their own
+    tab_out, tab_budget, tab_trends, tab_in = st.tabs(["Out", "Budget", "Trends", "In"])
+    
+    with tab_out:
+        render_out_tab(use_api)
+    
+    with tab_budget:
+        render_budget_tab(use_api)
+    
+    with tab_trends:
+        render_trends_tab(use_api)
+    
+    with tab_in:
+        render_in_tab(use_api)
+    
+    # Add footer with raw data buttons
+    st.divider()
+    
+    render_raw_data_panel(use_api)
+    
+    prefetch_adjacent_months(use_api)
+    
+    if profile:
+        render_profile_panel()
+        profiling.write_metrics()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
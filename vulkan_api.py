@@ -1,32 +1,219 @@
 import requests
 import pandas as pd
-from io import StringIO
-from typing import Dict
+import pyarrow as pa
+import urllib3
+from typing import Dict, List, Optional
+import logging
 import os
-import streamlit as st
+import threading
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import profiling
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a connection and for each read from the socket
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('VULKAN_API_CONNECT_TIMEOUT', '5'))
+DEFAULT_READ_TIMEOUT = float(os.getenv('VULKAN_API_READ_TIMEOUT', '30'))
+
+# Retries for idempotent GETs on connection errors and transient statuses
+DEFAULT_RETRIES = int(os.getenv('VULKAN_API_RETRIES', '3'))
+DEFAULT_BACKOFF = float(os.getenv('VULKAN_API_BACKOFF', '0.5'))
+
+# Explicit column types so parsing never has to infer them from the data
+TRANSACTION_DTYPES = {
+    'Date': 'str',
+    'Name': 'str',
+    'Amount': 'float64',
+    'Category': 'str',
+    'SubCategory': 'str',
+    'PaymentMethod': 'str',
+    'Notes': 'str',
+}
+
+# Rows parsed per chunk by the default engine; bounds the parser's working memory
+CSV_CHUNK_ROWS = int(os.getenv('VULKAN_CSV_CHUNK_ROWS', '50000'))
+
+# 'c' (chunked pandas parser) or 'pyarrow' (multithreaded, reads the stream directly)
+CSV_ENGINE = os.getenv('VULKAN_CSV_ENGINE', 'c')
+
+def parse_transactions_csv(source, engine: str = CSV_ENGINE) -> pd.DataFrame:
+    """Parse a transactions CSV from a path or binary stream without buffering it whole"""
+    try:
+        if engine == 'pyarrow':
+            return pd.read_csv(source, dtype=TRANSACTION_DTYPES, engine='pyarrow')
+        frames = list(pd.read_csv(source, dtype=TRANSACTION_DTYPES, chunksize=CSV_CHUNK_ROWS))
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, ignore_index=True)
+
+# Errors raised while the body is read and decoded off the socket, after requests has handed it over:
+# timeouts and dropped connections mid-body, and truncated or corrupt CSV, Arrow or Parquet
+BODY_ERRORS = (urllib3.exceptions.HTTPError, pd.errors.ParserError, pa.ArrowInvalid)
+
+# Media types /vault/data may answer with
+ARROW_STREAM_TYPE = 'application/vnd.apache.arrow.stream'
+PARQUET_TYPE = 'application/vnd.apache.parquet'
+CSV_TYPE = 'text/csv'
+TRANSFER_TYPES = {'arrow': ARROW_STREAM_TYPE, 'parquet': PARQUET_TYPE, 'csv': CSV_TYPE}
+
+# Formats requested for /vault/data, most preferred first; CSV is always accepted as the fallback
+TRANSFER_FORMATS = [name.strip() for name in os.getenv('VULKAN_TRANSFER_FORMATS', 'arrow,parquet,csv').split(',')]
+
+def accept_header(formats: List[str] = TRANSFER_FORMATS) -> str:
+    """Accept value listing formats in preference order, with CSV last if not already listed"""
+    types = [TRANSFER_TYPES[name] for name in formats if name in TRANSFER_TYPES]
+    if CSV_TYPE not in types:
+        types.append(CSV_TYPE)
+    return ', '.join(media_type if i == 0 else f"{media_type};q={1 - i / 10:.1f}" for i, media_type in enumerate(types))
+
+def arrow_to_transactions(table) -> pd.DataFrame:
+    """Transactions frame from an Arrow table, with the column types parse_transactions_csv gives"""
+    # Buffers are handed to pandas rather than copied where the types allow; the table is consumed
+    df = table.to_pandas(date_as_object=False, split_blocks=True, self_destruct=True)
+    if 'Date' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Date']):
+        df['Date'] = df['Date'].astype('datetime64[us]')
+    return df
+
+def parse_transactions_arrow(source) -> pd.DataFrame:
+    """Decode an Arrow IPC stream of transactions from a binary stream, batch by batch"""
+    with pa.ipc.open_stream(source) as reader:
+        return arrow_to_transactions(reader.read_all())
+
+def parse_transactions_parquet(data: bytes) -> pd.DataFrame:
+    """Decode a Parquet file of transactions held in memory"""
+    import pyarrow.parquet as pq
+    return arrow_to_transactions(pq.read_table(pa.BufferReader(data)))
+
+class VulkanAPIError(Exception):
+    """A Vulkan API request failed; raised only when the caller passes raise_errors"""
 
 class VulkanAPI:
-    def __init__(self):
+    def __init__(self, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT, read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, backoff_factor: float = DEFAULT_BACKOFF):
         self.base_url = os.getenv('VULKAN_API_URL')
         self.headers = {'X-API-KEY': os.getenv('WELL_API_KEY')}
-    
-    def get_transactions(self) -> pd.DataFrame:
-        """Fetch all transactions from API"""
-        try:
-            response = requests.get(f"{self.base_url}/vault/data", headers=self.headers)
+        self.timeout = (connect_timeout, read_timeout)
+
+        # One pooled keep-alive session per client; build the client once and share it
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=16)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(self.headers)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+        # Message of the most recent failed fetch, cleared by the next success, for a UI to show
+        self.last_error: Optional[str] = None
+
+        # Validators of the last conditional 200 per path and the params it answered; bodies are not kept
+        self._validators = {}
+        self._validators_lock = threading.Lock()
+
+    def _get_cached(self, path: str, parse, params: Optional[Dict] = None, stream: bool = False,
+                    headers: Optional[Dict] = None, if_changed: bool = False):
+        """GET path and parse the body; with if_changed, None if it is unchanged since the last such GET.
+
+        Unchanged means the server answered 304 Not Modified to the validators
+        of the last if_changed GET of path with the same params.
+        """
+        params_key = tuple(sorted((params or {}).items()))
+        cached = None
+        if if_changed:
+            with self._validators_lock:
+                cached = self._validators.get(path)
+            if cached and cached['params'] != params_key:
+                cached = None
+
+        headers = dict(headers or {})
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        with profiling.span('fetch', path=path):
+            response = self.session.get(f"{self.base_url}{path}", params=params, headers=headers,
+                                        timeout=self.timeout, stream=stream)
+        with response:
+            if cached:
+                profiling.cache_lookup('http_conditional_get', hit=response.status_code == 304)
+            if response.status_code == 304 and cached:
+                return None
             response.raise_for_status()
-            return pd.read_csv(StringIO(response.text))
-        except requests.RequestException as e:
-            st.error(f"Failed to fetch transactions from API: {e}")
+            # With stream=True this includes reading the body off the socket
+            with profiling.span('parse', path=path, bytes=response.headers.get('Content-Length'),
+                                format=response.headers.get('Content-Type')):
+                body = parse(response)
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if if_changed and (etag or last_modified):
+            with self._validators_lock:
+                self._validators[path] = {'params': params_key, 'etag': etag, 'last_modified': last_modified}
+        return body
+
+    def _failed(self, message: str, raise_errors: bool = False):
+        logger.error(message)
+        self.last_error = message
+        if raise_errors:
+            raise VulkanAPIError(message)
+
+    @staticmethod
+    def _parse_transactions(response) -> pd.DataFrame:
+        # The server picks the format from our Accept header; anything unrecognised is read as CSV
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        if content_type == PARQUET_TYPE:
+            # Parquet's footer sits at the end, so the body has to be held whole
+            return parse_transactions_parquet(response.content)
+        # Parse straight off the socket, gunzipping on the fly, instead of holding response.text
+        response.raw.decode_content = True
+        if content_type == ARROW_STREAM_TYPE:
+            return parse_transactions_arrow(response.raw)
+        return parse_transactions_csv(response.raw)
+
+    def get_transactions(self, since: Optional[str] = None, if_changed: bool = False,
+                         raise_errors: bool = False) -> Optional[pd.DataFrame]:
+        """Fetch transactions from API, only those dated on or after since if given.
+
+        With if_changed, returns None instead when nothing changed since the
+        last if_changed fetch with the same since. A failure returns an empty
+        frame, or raises VulkanAPIError with raise_errors.
+        """
+        # Servers that ignore since return everything; callers diff against what they hold
+        params = {'since': since} if since else None
+        try:
+            df = self._get_cached("/vault/data", self._parse_transactions, params, stream=True,
+                                  headers={'Accept': accept_header()}, if_changed=if_changed)
+            self.last_error = None
+            return df
+        except (requests.RequestException, *BODY_ERRORS) as e:
+            self._failed(f"Failed to fetch transactions from API: {e}", raise_errors)
             return pd.DataFrame()
-    
-    def get_budget(self, month: str) -> Dict:
-        """Fetch budget data for specific month"""
+
+    def get_budget_document(self, if_changed: bool = False, raise_errors: bool = False) -> Optional[Dict]:
+        """Fetch the whole budget document, keyed by YYYY-MM month; with if_changed, None if unchanged.
+
+        A failure returns an empty document, or raises VulkanAPIError with raise_errors.
+        """
         try:
-            response = requests.get(f"{self.base_url}/vault/budget", headers=self.headers)
-            response.raise_for_status()
-            budget_data = response.json()
-            return budget_data.get(month, {})
+            document = self._get_cached("/vault/budget", lambda response: response.json(), if_changed=if_changed)
+            self.last_error = None
+            return document
         except requests.RequestException as e:
-            st.error(f"Failed to fetch budget from API: {e}")
+            self._failed(f"Failed to fetch budget from API: {e}", raise_errors)
             return {}
+
+    def get_budget(self, month: str) -> Dict:
+        """Fetch budget data for specific month"""
+        return dict(self.get_budget_document().get(month, {}))